@@ -1,5 +1,9 @@
 # claro_automation_app
 import logging, os, time
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from dotenv import load_dotenv
 from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
@@ -8,17 +12,26 @@ from pages.claro.claro_login_page import LoginPage
 from pages.claro.claro_invoice_page import FaturaPage
 from pages.claro.claro_pending_invoices_page import FaturasPendentesPage
 from services.claro_invoice_download_service import DownloadService
-from utils.download_utils import garantir_diretorio
+from utils.download_utils import CHROME_DOWNLOAD_DIR, garantir_diretorio
+from utils.download_watcher import registrar_metricas_downloads
+from utils.http_download_client import obter_cliente_http
 from utils.driver.claro_chrome_driver import configurar_driver_chrome
+from utils.driver.driver_pool import PoolDrivers, driver_saudavel
+from utils.driver.performance_profile import pagina_pronta, registrar_metricas_carregamento
 from utils.popup_manager import PopupManager
 from utils.session_manager_claro import ClaroSessionHandler
+from processors.invoice_processor import encerrar_fatura_service
+from processors.ingestion_queue import drenar_fila_ingestao, somar_resumos_ingestao
+from config.database_engine import engine
+from config.logger_config import definir_prefixo_log
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 
 class ClaroAutomationApp:
-    def __init__(self):
+    def __init__(self, worker_id: Optional[int] = None, total_workers: Optional[int] = None,
+                 catalogo_salvo: Optional[str] = None):
         load_dotenv()
         self.driver = None
         self.USUARIO_CLARO = os.getenv("USUARIO_CLARO")
@@ -32,17 +45,48 @@ class ClaroAutomationApp:
         self.claro_base_folder = os.path.join(self.LINUX_DOWNLOAD_DIR, "Claro")
         garantir_diretorio(self.claro_base_folder)
 
+        # Worker k de N processa as páginas de contratos p com (p - 1) % N == k - 1,
+        # com perfil do Chrome e pasta de download próprios.
+        self.worker_id = worker_id
+        self.total_workers = total_workers or int(os.getenv("CLARO_WORKERS", "1"))
+        # Fora do modo worker, os arquivos continuam sendo lidos de CHROME_DOWNLOAD_DIR.
+        self.download_dir = self.claro_base_folder
+        self.origem_downloads = None
+        if worker_id is not None:
+            pasta_worker = os.path.join(self.LINUX_DOWNLOAD_DIR, "claro_workers", f"worker_{worker_id}")
+            self.USER_DATA_DIR = os.path.join(pasta_worker, "perfil")
+            self.download_dir = os.path.join(pasta_worker, "downloads")
+            self.origem_downloads = self.download_dir
+            garantir_diretorio(self.download_dir)
+
+        # Catálogo de contratos persistido por execução (e por worker).
+        sufixo = f"_worker_{worker_id}" if worker_id is not None else ""
+        self.caminho_catalogo = os.path.join(
+            self.LINUX_DOWNLOAD_DIR, "claro_catalogo", f"catalogo_{datetime.now():%Y%m%d_%H%M%S}{sufixo}.json"
+        )
+        # Catálogo de uma execução anterior: retoma dos contratos não concluídos, sem recatalogar a listagem.
+        # No modo worker, é o catálogo montado pelo processo principal.
+        self.catalogo_salvo = catalogo_salvo or os.getenv("CLARO_CATALOGO_RETOMAR") or None
+
+        self.pool = None
         self.session_handler = None
         self.fatura_page = None
         self.download_service = None
 
+    def _criar_driver(self):
+        return configurar_driver_chrome(
+            user_data_dir=self.USER_DATA_DIR,
+            profile_directory=self.PROFILE_DIRECTORY,
+            download_dir=self.download_dir
+        )
+
     def _setup_driver(self):
         try:
-            self.driver = configurar_driver_chrome(
-                user_data_dir=self.USER_DATA_DIR,
-                profile_directory=self.PROFILE_DIRECTORY,
-                download_dir=self.claro_base_folder
-            )
+            if self.pool is None:
+                # Sem navegadores reserva: o perfil do Chrome (user-data-dir) não abre em dois navegadores ao
+                # mesmo tempo. O pool centraliza a criação e a troca do navegador.
+                self.pool = PoolDrivers(self._criar_driver)
+            self.driver = self.pool.obter()
             self.driver.set_page_load_timeout(70)
             return True
         except WebDriverException as e:
@@ -57,9 +101,7 @@ class ClaroAutomationApp:
             login_page.open_login_page()
             popup_manager.handle_all()
 
-            WebDriverWait(self.driver, 20).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )
+            WebDriverWait(self.driver, 20).until(pagina_pronta)
             time.sleep(1)
 
             if login_page.esta_logado():
@@ -68,24 +110,26 @@ class ClaroAutomationApp:
                 logger.info("Usuário não está logado. Iniciando login...")
                 login_page.perform_login(self.USUARIO_CLARO, self.SENHA_CLARO)
                 popup_manager.handle_all()
-                WebDriverWait(self.driver, 20).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
+                WebDriverWait(self.driver, 20).until(pagina_pronta)
                 time.sleep(1)
                 logger.info("Login concluído.")
 
             self.session_handler = ClaroSessionHandler(
                 self.driver, login_page, self.USUARIO_CLARO, self.SENHA_CLARO
             )
+            # Cookies da sessão autenticada para o download HTTP direto (quando habilitado).
+            obter_cliente_http(self.driver)
 
         except Exception as e:
             logger.error(f"Erro durante o login: {type(e).__name__} - {e}", exc_info=True)
             raise
 
     def _init_services(self):
-        self.fatura_page = FaturaPage(self.driver, self.claro_base_folder)
-        faturas_pendentes_page = FaturasPendentesPage(self.driver)
-        self.download_service = DownloadService(self.driver, faturas_pendentes_page)
+        self.fatura_page = FaturaPage(self.driver, self.claro_base_folder, caminho_catalogo=self.caminho_catalogo)
+        faturas_pendentes_page = FaturasPendentesPage(
+            self.driver, download_dir=self.origem_downloads or CHROME_DOWNLOAD_DIR
+        )
+        self.download_service = DownloadService(self.driver, faturas_pendentes_page, download_dir=self.origem_downloads)
 
     def _process_contracts(self):
         def download_faturas_callback(numero_contrato: str):
@@ -115,34 +159,131 @@ class ClaroAutomationApp:
                     )
                 return []
 
+        catalogo_salvo = self.catalogo_salvo
+
         def action():
+            self.fatura_page.processar_todos_contratos_ativos(
+                download_faturas_callback,
+                self.CONTRATOS_URL,
+                self._pagina_do_worker if self.worker_id is not None else None,
+                catalogo_salvo
+            )
+
+        for tentativa in range(2):
             try:
-                self.fatura_page.processar_todos_contratos_ativos(
-                    download_faturas_callback,
-                    self.CONTRATOS_URL
-                )
+                self.session_handler.execute_with_session(action)
+                return
             except Exception as e:
                 logger.error(
                     f"Erro ao processar contratos: {type(e).__name__} - {e}",
                     exc_info=True
                 )
+                if tentativa or driver_saudavel(self.driver):
+                    return
+            # Navegador perdido: troca pelo próximo do pool e retoma pelo catálogo salvo, sem recatalogar.
+            logger.warning("Navegador Claro não responde; substituindo e retomando pelo catálogo.")
+            if self.fatura_page.catalogo is not None:
+                catalogo_salvo = self.caminho_catalogo
+            self._substituir_driver()
+
+    def _substituir_driver(self):
+        self.pool.descartar(self.driver)
+        self.driver = None
+        if not self._setup_driver():
+            raise RuntimeError("driver substituto não configurado")
+        self._login()
+        self._init_services()
+
+    def _pagina_do_worker(self, pagina: int) -> bool:
+        return (pagina - 1) % self.total_workers == self.worker_id - 1
+
+    def _catalogar_para_workers(self) -> Optional[str]:
+        # A listagem é percorrida uma única vez aqui; cada worker carrega do catálogo só as páginas da sua faixa.
+        if not self._setup_driver():
+            return None
+        try:
+            self._login()
+            self._init_services()
+            self.session_handler.execute_with_session(
+                lambda: self.fatura_page.catalogar_contratos(self.CONTRATOS_URL)
+            )
+            return self.caminho_catalogo
+        except Exception as e:
+            logger.error(f"Erro ao catalogar contratos para os workers: {type(e).__name__} - {e}", exc_info=True)
+            return None
+        finally:
+            # O navegador principal é liberado antes de os workers iniciarem.
+            self.pool.descartar(self.driver)
+            self.driver = None
+            self.pool.encerrar()
+            self.pool = None
+
+    def _run_workers(self, aguardar_confirmacao: bool) -> dict:
+        catalogo = self.catalogo_salvo or self._catalogar_para_workers()
+        if not catalogo:
+            return {"operadora": "CLARO", "sucesso": False, "erro": "catálogo de contratos não montado", "ingestao": None}
+
+        logger.info(f"Distribuindo páginas de contratos entre {self.total_workers} navegador(es) Claro.")
+        contexto = multiprocessing.get_context("fork")
+        resumos = []
+        with ProcessPoolExecutor(max_workers=self.total_workers, mp_context=contexto) as executor:
+            futuros = [
+                executor.submit(_executar_worker_claro, worker_id, self.total_workers, catalogo)
+                for worker_id in range(1, self.total_workers + 1)
+            ]
+            for worker_id, futuro in enumerate(futuros, 1):
+                try:
+                    resumos.append(futuro.result())
+                except Exception as e:
+                    logger.error(f"Worker Claro {worker_id} falhou. Erro: {type(e).__name__}")
+                    resumos.append({"sucesso": False, "erro": f"worker {worker_id}: {type(e).__name__}: {e}", "ingestao": None})
+
+        if aguardar_confirmacao:
+            input("⏸ Pressione Enter para encerrar...")
+
+        erros = [r["erro"] for r in resumos if r["erro"]]
+        return {
+            "operadora": "CLARO",
+            "sucesso": all(r["sucesso"] for r in resumos),
+            "erro": "; ".join(erros) or None,
+            "ingestao": somar_resumos_ingestao(*(r["ingestao"] for r in resumos)),
+        }
 
-        self.session_handler.execute_with_session(action)
+    def run(self, aguardar_confirmacao: bool = True) -> dict:
+        if self.worker_id is None and self.total_workers > 1:
+            return self._run_workers(aguardar_confirmacao)
 
-    def run(self):
+        resumo = {"operadora": "CLARO", "sucesso": False, "erro": None, "ingestao": None}
         if not self._setup_driver():
-            return
+            resumo["erro"] = "driver não configurado"
+            return resumo
 
         try:
             self._login()
             self._init_services()
             self._process_contracts()
+            resumo["sucesso"] = True
         except Exception as e:
             logger.error(f"Erro inesperado na automação Claro: {type(e).__name__} - {e}", exc_info=True)
+            resumo["erro"] = f"{type(e).__name__}: {e}"
         finally:
-            input("⏸ Pressione Enter para encerrar...")
+            resumo["ingestao"] = drenar_fila_ingestao()
+            registrar_metricas_downloads()
             if self.driver:
-                try:
-                    self.driver.quit()
-                except Exception as e:
-                    logger.warning(f"Erro ao encerrar driver: {type(e).__name__} - {e}")
+                registrar_metricas_carregamento(self.driver)
+            if aguardar_confirmacao:
+                input("⏸ Pressione Enter para encerrar...")
+            if self.driver:
+                self.pool.descartar(self.driver)
+            if self.pool:
+                self.pool.encerrar()
+            encerrar_fatura_service()
+
+        return resumo
+
+
+def _executar_worker_claro(worker_id: int, total_workers: int, catalogo: str) -> dict:
+    # Processo filho: as conexões herdadas do processo pai não podem ser reutilizadas aqui.
+    engine.dispose(close=False)
+    definir_prefixo_log(f"CLARO-{worker_id}")
+    return ClaroAutomationApp(worker_id, total_workers, catalogo).run(aguardar_confirmacao=False)
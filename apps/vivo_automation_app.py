@@ -4,10 +4,14 @@ import logging
 from selenium.common.exceptions import InvalidSessionIdException
 from dotenv import load_dotenv
 from utils.driver.vivo_chrome_driver import create_driver
-from pages.vivo.vivo_login_page import LoginPageVivo
+from utils.driver.driver_pool import PoolDrivers
 from processors.vivo.customer_invoice_processor_vivo import process_customers
-from utils.session_manager_vivo import ensure_logged_in
-from utils.popup_manager import PopupManager 
+from processors.vivo.sharded_customer_processor_vivo import process_customers_sharded, collect_cnpjs
+from utils.session_manager_vivo import login_vivo
+from processors.invoice_processor import encerrar_fatura_service
+from processors.ingestion_queue import drenar_fila_ingestao, somar_resumos_ingestao
+from utils.download_watcher import registrar_metricas_downloads
+from utils.driver.performance_profile import registrar_metricas_carregamento
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -21,8 +25,10 @@ class ApplicationVivo:
         self.LINUX_DOWNLOAD_DIR = os.getenv("LINUX_DOWNLOAD_DIR")
         self.USER_DATA_DIR = os.getenv("CHROME_USER_DATA_DIR")
         self.PROFILE_DIRECTORY = os.getenv("CHROME_PROFILE_DIRECTORY")
+        self.workers = int(os.getenv("VIVO_WORKERS", "1"))
 
         self.driver = None
+        self.pool = None
         self.popup_handler = None
         self.login_page = None
 
@@ -44,52 +50,81 @@ class ApplicationVivo:
                     time.sleep(0.5)
         return False
 
-    def run(self, skip_existing=True, max_login_attempts=3):
+    def _replace_driver(self):
+        self.pool.descartar(self.driver)
+        self.driver = self.pool.obter()
+        sessao = login_vivo(self.driver, self.login_url, self.usuario, self.senha)
+        if sessao is None:
+            raise RuntimeError("login não confirmado no navegador substituto")
+        self.login_page, self.popup_manager = sessao
+        return self.driver, self.popup_manager, self.login_page
+
+    def run(self, skip_existing=True, max_login_attempts=3) -> dict:
+        resumo = {"operadora": "VIVO", "sucesso": False, "erro": None, "ingestao": None}
         if not self.usuario or not self.senha:
             logging.error("LOGIN_USUARIO ou LOGIN_SENHA não encontrados no .env")
-            return
+            resumo["erro"] = "credenciais ausentes"
+            return resumo
 
         try:
-            self.driver = create_driver(self.LINUX_DOWNLOAD_DIR)
-            self.popup_manager = PopupManager(self.driver, timeout=2)
-            self.login_page = LoginPageVivo(self.driver, self.login_url)
-            self.login_page.open_login_page()
-            self.login_page.perform_login(self.usuario, self.senha)
-            self.popup_manager.handle_all()
+            # Navegadores reserva (DRIVER_POOL_TAMANHO) só no modo de um processo; com workers, cada um tem o seu pool.
+            self.pool = PoolDrivers(
+                lambda: create_driver(self.LINUX_DOWNLOAD_DIR),
+                int(os.getenv("DRIVER_POOL_TAMANHO", "0")) if self.workers <= 1 else 0
+            )
+            self.pool.iniciar()
+            self.driver = self.pool.obter()
+            sessao = login_vivo(self.driver, self.login_url, self.usuario, self.senha, max_login_attempts)
+            if sessao is None:
+                resumo["erro"] = "login não confirmado"
+                return resumo
+            self.login_page, self.popup_manager = sessao
 
-            attempt = 0
-            while attempt < max_login_attempts:
-                try:
-                    ensure_logged_in(self.driver, self.login_page, self.usuario, self.senha)
-                    break
-                except Exception as e:
-                    attempt += 1
-                    logging.warning(f"Erro ao checar/refazer login (tentativa {attempt}): {e}")
-                    time.sleep(2)
-                    self.login_page.perform_login(self.usuario, self.senha)
-                    self.popup_manager.handle_all()
+            if self.workers > 1:
+                # A lista de CNPJs é coletada uma vez; o navegador principal é liberado para os workers.
+                cnpjs = collect_cnpjs(self.driver)
+                self.pool.descartar(self.driver)
+                self.driver = None
+                if not cnpjs:
+                    logging.warning("Nenhum CNPJ encontrado.")
+                else:
+                    relatorio = process_customers_sharded(
+                        cnpjs, self.usuario, self.senha, self.login_url,
+                        self.LINUX_DOWNLOAD_DIR, self.workers, skip_existing
+                    )
+                    resumo["cnpjs"] = relatorio["cnpjs"]
+                    resumo["ingestao"] = relatorio["ingestao"]
             else:
-                logging.error("Não foi possível garantir login após várias tentativas.")
-                return
-
-            process_customers(
-                self.driver,
-                self.popup_manager,
-                self.login_page,
-                self.usuario,
-                self.senha,
-                self.LINUX_DOWNLOAD_DIR, 
-                skip_existing
-            )
+                process_customers(
+                    self.driver,
+                    self.popup_manager,
+                    self.login_page,
+                    self.usuario,
+                    self.senha,
+                    self.LINUX_DOWNLOAD_DIR, 
+                    skip_existing,
+                    replace_driver_fn=self._replace_driver
+                )
 
             logging.info("Automação Vivo finalizada com sucesso.")
+            resumo["sucesso"] = True
 
         except InvalidSessionIdException:
             logging.error("A sessão do navegador foi encerrada inesperadamente.")
-        except Exception:
+            resumo["erro"] = "sessão do navegador encerrada"
+        except Exception as e:
             import traceback
             logging.error("Erro inesperado na execução:")
             logging.error(traceback.format_exc())
+            resumo["erro"] = f"{type(e).__name__}: {e}"
         finally:
             if self.driver:
-                self.driver.quit()
+                registrar_metricas_carregamento(self.driver)
+                self.pool.descartar(self.driver)
+            if self.pool:
+                self.pool.encerrar()
+            resumo["ingestao"] = somar_resumos_ingestao(resumo["ingestao"], drenar_fila_ingestao())
+            registrar_metricas_downloads()
+            encerrar_fatura_service()
+
+        return resumo
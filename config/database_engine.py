@@ -1,7 +1,84 @@
-from sqlalchemy import create_engine
+import os
+import time
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
 from config.database_config import DATABASE_URL
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 
-engine = create_engine(DATABASE_URL, echo=False)
 
-Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
\ No newline at end of file
+class MetricasPool:
+    def __init__(self):
+        self.checkouts = 0
+        self.conexoes_criadas = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self._lock = threading.Lock()
+
+    def registrar_espera(self, segundos: float):
+        with self._lock:
+            self.esperas += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+
+    def registrar_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def registrar_conexao(self):
+        with self._lock:
+            self.conexoes_criadas += 1
+
+
+metricas_pool = MetricasPool()
+
+
+class QueuePoolMedido(QueuePool):
+    # Mede o tempo que cada checkout espera por uma conexão livre (ou pela abertura de uma nova).
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metricas_pool.registrar_espera(time.perf_counter() - inicio)
+
+
+def _env_bool(nome: str, padrao: str) -> bool:
+    return os.getenv(nome, padrao).lower() in ("1", "true", "sim")
+
+
+def _configuracao_pool() -> dict:
+    if DATABASE_URL.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": QueuePoolMedido,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", "true"),
+    }
+
+
+engine = create_engine(DATABASE_URL, echo=False, **_configuracao_pool())
+
+event.listen(engine, "checkout", lambda *_: metricas_pool.registrar_checkout())
+event.listen(engine, "connect", lambda *_: metricas_pool.registrar_conexao())
+
+SessionFactory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+# Uma sessão por thread; Session.remove() devolve a conexão ao pool.
+Session = scoped_session(SessionFactory)
+
+
+def obter_metricas_pool() -> dict:
+    with metricas_pool._lock:
+        metricas = {
+            "checkouts": metricas_pool.checkouts,
+            "conexoes_criadas": metricas_pool.conexoes_criadas,
+            "espera_media_ms": (metricas_pool.espera_total / metricas_pool.esperas * 1000) if metricas_pool.esperas else 0.0,
+            "espera_maxima_ms": metricas_pool.espera_maxima * 1000,
+        }
+    metricas["status"] = engine.pool.status()
+    return metricas
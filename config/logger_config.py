@@ -15,3 +15,9 @@ def setup_logging():
     logging.getLogger("urllib3").setLevel(logging.WARNING)
 
     return logging.getLogger(__name__)
+
+def definir_prefixo_log(prefixo: str):
+    # Usado nos processos filhos da execução concorrente para distinguir as linhas de cada operadora.
+    formato = logging.Formatter(f"%(asctime)s [%(levelname)s] [{prefixo}] %(message)s")
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(formato)
@@ -1,8 +1,35 @@
 import re
-import pdfplumber
-from datetime import datetime
-
-def extrair_claro(pdf_path: str) -> list:
+from extractors.pdf_document import DocumentoPdf
+from extractors.field_engine import (
+    Campo, Padrao, EspecificacaoCampos, ler_paginas_necessarias, texto_limpo, moeda_br, data_br, sufixo, constante
+)
+from models.invoice_model import CAMPOS_OBRIGATORIOS_EXTRACAO
+
+CAMPOS_CLARO = EspecificacaoCampos([
+    Campo("numero_contrato", [Padrao(r"C[oó]digo[:\s]*(\d+/\d+)", re.IGNORECASE)], texto_limpo),
+    Campo("numero_fatura", [Padrao(r"N[uú]mero[:\s]*(\d+)", re.IGNORECASE)], texto_limpo),
+    Campo("numero_nf", [Padrao(r"(\d{6,})\s*N[uú]mero", re.IGNORECASE)], texto_limpo),
+    Campo("nome_fornecedor", [
+        Padrao(r"(Claro\s+NXT\s+Telecomunica[cç][oõ]es\s+S\.?A\.?)", re.IGNORECASE)
+    ], texto_limpo),
+    Campo("data_emissao", [Padrao(r"Emiss[aã]o[:\s]*(\d{2}/\d{2}/\d{4})", re.IGNORECASE)], data_br),
+    Campo("data_vencimento", [Padrao(r"Vencimento[:\s]*(\d{2}/\d{2}/\d{4})", re.IGNORECASE)], data_br),
+    Campo("valor_total", [Padrao(r"Valor total[:\s]*([\d.,]+)", re.IGNORECASE)], moeda_br),
+    Campo("valores_juros", [Padrao(r"juros\s+\w+\s+de\s+([\d.,]+)%", re.IGNORECASE)], sufixo("% ao dia")),
+    Campo("valores_multa", [Padrao(r"multa\s+de\s+([\d.,]+)%", re.IGNORECASE)], sufixo("%")),
+    Campo("forma_pagamento", [Padrao(r"DÉBITO AUTOMÁTICO", re.IGNORECASE, grupo=0)], constante("Débito Automático")),
+    Campo("numero_cnpj", [Padrao(r"CNPJ[:\s]*([\d./-]+)", re.IGNORECASE)], texto_limpo),
+    Campo("valor_nf", [Padrao(r"TOTAL\s+DA\s+NOTA\s+FISCAL[:\s]*([\d.,]+)", re.IGNORECASE)], moeda_br),
+    Campo("numero_serie", [Padrao(r"S[EÉ]RIE[:\s]*([A-Z0-9]+)", re.IGNORECASE)], texto_limpo),
+    Campo("valor_icms", [Padrao(r"ICMS.*?Valor[:\s]*([\d.,]+)", re.IGNORECASE)], moeda_br),
+    Campo("base_calculo_icms", [Padrao(r"Base de C[áa]lculo[:\s]*([\d.,]+)", re.IGNORECASE)], moeda_br),
+    Campo("valor_aliquota", [Padrao(r"Al[ií]quota[:\s]*([\d.,]+)%", re.IGNORECASE)], sufixo("%")),
+])
+
+def _textos_claro(documento: DocumentoPdf) -> dict:
+    return {"texto": documento.texto_normalizado}
+
+def extrair_claro(documento: DocumentoPdf, incremental: bool = False) -> list:
     dados = {
         "operadora": "CLARO",
         "numero_contrato": None,
@@ -26,83 +53,10 @@ def extrair_claro(pdf_path: str) -> list:
         "numero_fatura": None,
     }
 
-    with pdfplumber.open(pdf_path) as pdf:
-        texto = ""
-        for pagina in pdf.pages:
-            t = pagina.extract_text()
-            if t:
-                texto += t + "\n"
-
-    texto = re.sub(r'\s+', ' ', texto).strip()
-
-    match_contrato = re.search(r"C[oó]digo[:\s]*(\d+/\d+)", texto, re.IGNORECASE)
-    if match_contrato:
-        dados["numero_contrato"] = match_contrato.group(1).strip()
-
-    match_fatura = re.search(r"N[uú]mero[:\s]*(\d+)", texto, re.IGNORECASE)
-    if match_fatura:
-        dados["numero_fatura"] = match_fatura.group(1).strip()
-
-    match_numero_nf = re.search(r"(\d{6,})\s*N[uú]mero", texto, re.IGNORECASE)
-    if match_numero_nf:
-        dados["numero_nf"] = match_numero_nf.group(1).strip()
-
-    match_fornecedor = re.search(
-        r"(Claro\s+NXT\s+Telecomunica[cç][oõ]es\s+S\.?A\.?)", texto, re.IGNORECASE
-    )
-    if match_fornecedor:
-        dados["nome_fornecedor"] = match_fornecedor.group(1).strip()
-
-    match_emissao = re.search(r"Emiss[aã]o[:\s]*(\d{2}/\d{2}/\d{4})", texto, re.IGNORECASE)
-    if match_emissao:
-        dados["data_emissao"] = datetime.strptime(match_emissao.group(1), "%d/%m/%Y").date()
-
-    match_venc = re.search(r"Vencimento[:\s]*(\d{2}/\d{2}/\d{4})", texto, re.IGNORECASE)
-    if match_venc:
-        dados["data_vencimento"] = datetime.strptime(match_venc.group(1), "%d/%m/%Y").date()
-
-    match_total = re.search(r"Valor total[:\s]*([\d.,]+)", texto, re.IGNORECASE)
-    if match_total:
-        dados["valor_total"] = float(match_total.group(1).replace(".", "").replace(",", "."))
-
-    match_juros = re.search(r"juros\s+\w+\s+de\s+([\d.,]+)%", texto, re.IGNORECASE)
-    if match_juros:
-        dados["valores_juros"] = match_juros.group(1) + "% ao dia"
-
-    match_multa = re.search(r"multa\s+de\s+([\d.,]+)%", texto, re.IGNORECASE)
-    if match_multa:
-        dados["valores_multa"] = match_multa.group(1) + "%"
-
-    if "DÉBITO AUTOMÁTICO" in texto.upper():
-        dados["forma_pagamento"] = "Débito Automático"
-
-    match_cnpj = re.search(r"CNPJ[:\s]*([\d./-]+)", texto, re.IGNORECASE)
-    if match_cnpj:
-        dados["numero_cnpj"] = match_cnpj.group(1).strip()
-
-    match_valor_nf = re.search(r"TOTAL\s+DA\s+NOTA\s+FISCAL[:\s]*([\d.,]+)", texto, re.IGNORECASE)
-    if match_valor_nf:
-        valor_nf_str = match_valor_nf.group(1).replace(".", "").replace(",", ".")
-        try:
-            dados["valor_nf"] = float(valor_nf_str)
-        except ValueError:
-            dados["valor_nf"] = None
-
-    match_serie = re.search(r"S[EÉ]RIE[:\s]*([A-Z0-9]+)", texto, re.IGNORECASE)
-    if match_serie:
-        dados["numero_serie"] = match_serie.group(1).strip()
-
-    match_icms = re.search(r"ICMS.*?Valor[:\s]*([\d.,]+)", texto, re.IGNORECASE)
-    if match_icms:
-        dados["valor_icms"] = float(match_icms.group(1).replace(".", "").replace(",", "."))
-
-    match_base_icms = re.search(r"Base de C[áa]lculo[:\s]*([\d.,]+)", texto, re.IGNORECASE)
-    if match_base_icms:
-        dados["base_calculo_icms"] = float(match_base_icms.group(1).replace(".", "").replace(",", "."))
+    if incremental:
+        documento = ler_paginas_necessarias(documento, CAMPOS_CLARO, _textos_claro, CAMPOS_OBRIGATORIOS_EXTRACAO)
 
-    match_aliquota = re.search(r"Al[ií]quota[:\s]*([\d.,]+)%", texto, re.IGNORECASE)
-    if match_aliquota:
-        dados["valor_aliquota"] = match_aliquota.group(1) + "%"
+    dados.update(CAMPOS_CLARO.extrair(_textos_claro(documento)))
 
     dados["valores_retencoes"] = None
 
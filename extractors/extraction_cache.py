@@ -0,0 +1,120 @@
+# extractors/extraction_cache.py
+import os
+import time
+import pickle
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheExtracao:
+    def __init__(self, caminho: str, max_itens: int = 10000):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self.acertos = 0
+        self.falhas = 0
+        self._conexao = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def gerar_chave(conteudo: bytes, versao: str) -> str:
+        return f"{hashlib.sha256(conteudo).hexdigest()}:{versao}"
+
+    def _conectar(self) -> sqlite3.Connection:
+        # Processos do pool herdam o objeto do processo pai; cada um abre a sua própria conexão.
+        if self._conexao is None or self._pid != os.getpid():
+            diretorio = os.path.dirname(self.caminho)
+            if diretorio:
+                os.makedirs(diretorio, exist_ok=True)
+            self._conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS extracoes ("
+                "chave TEXT PRIMARY KEY, faturas BLOB NOT NULL, acessado_em REAL NOT NULL)"
+            )
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_extracoes_acesso ON extracoes (acessado_em)")
+            self._conexao.commit()
+            self._pid = os.getpid()
+        return self._conexao
+
+    def registrar_consulta(self, acerto: bool):
+        if acerto:
+            self.acertos += 1
+        else:
+            self.falhas += 1
+
+    def obter(self, chave: str) -> Optional[list]:
+        try:
+            with self._lock:
+                conexao = self._conectar()
+                linha = conexao.execute("SELECT faturas FROM extracoes WHERE chave = ?", (chave,)).fetchone()
+                if linha is not None:
+                    conexao.execute("UPDATE extracoes SET acessado_em = ? WHERE chave = ?", (time.time(), chave))
+                    conexao.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Falha ao consultar cache de extração: {type(e).__name__} - {e}")
+            linha = None
+
+        if linha is None:
+            self.registrar_consulta(False)
+            return None
+
+        try:
+            faturas = pickle.loads(linha[0])
+        except Exception as e:
+            logger.warning(f"Entrada inválida no cache de extração: {type(e).__name__}")
+            self.registrar_consulta(False)
+            return None
+
+        self.registrar_consulta(True)
+        return faturas
+
+    def salvar(self, chave: str, faturas: list):
+        try:
+            with self._lock:
+                conexao = self._conectar()
+                conexao.execute(
+                    "INSERT OR REPLACE INTO extracoes (chave, faturas, acessado_em) VALUES (?, ?, ?)",
+                    (chave, pickle.dumps(faturas), time.time())
+                )
+                conexao.execute(
+                    "DELETE FROM extracoes WHERE chave NOT IN "
+                    "(SELECT chave FROM extracoes ORDER BY acessado_em DESC LIMIT ?)",
+                    (self.max_itens,)
+                )
+                conexao.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Falha ao gravar no cache de extração: {type(e).__name__} - {e}")
+
+    def estatisticas(self) -> dict:
+        return {"acertos": self.acertos, "falhas": self.falhas}
+
+
+def versao_codigo(*modulos) -> str:
+    # Hash do código-fonte dos módulos que produzem a extração: qualquer alteração neles invalida o cache.
+    resumo = hashlib.sha256()
+    for modulo in modulos:
+        with open(modulo.__file__, "rb") as f:
+            resumo.update(f.read())
+    return resumo.hexdigest()[:16]
+
+
+_cache_extracao = None
+
+
+def obter_cache_extracao() -> Optional[CacheExtracao]:
+    global _cache_extracao
+    if os.getenv("CACHE_EXTRACAO_HABILITADO", "true").lower() in ("0", "false", "nao", "não"):
+        return None
+
+    if _cache_extracao is None:
+        caminho = os.getenv("CACHE_EXTRACAO_PATH") or os.path.join(
+            os.getenv("LINUX_DOWNLOAD_DIR") or ".", "cache_extracao.sqlite3"
+        )
+        max_itens = int(os.getenv("CACHE_EXTRACAO_MAX_ITENS", "10000"))
+        _cache_extracao = CacheExtracao(caminho, max_itens)
+    return _cache_extracao
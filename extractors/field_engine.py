@@ -0,0 +1,151 @@
+# extractors/field_engine.py
+import re
+from datetime import datetime
+from typing import Callable, Optional
+from extractors.pdf_document import DocumentoPdf
+
+
+def texto_limpo(valor: str) -> str:
+    return valor.strip()
+
+
+def moeda_br(valor: str) -> float:
+    return float(valor.replace(".", "").replace(",", "."))
+
+
+def data_br(valor: str):
+    return datetime.strptime(valor.strip(), "%d/%m/%Y").date()
+
+
+def sufixo(texto: str) -> Callable[[str], str]:
+    return lambda valor: valor + texto
+
+
+def constante(resultado) -> Callable[[str], object]:
+    return lambda _: resultado
+
+
+class Padrao:
+    def __init__(self, regex: str, flags: int = 0, grupo: int = 1, conversor: Optional[Callable] = None,
+                 primeira_da_linha: bool = False):
+        self.regex = regex
+        self.flags = flags
+        self.grupo = grupo
+        self.conversor = conversor
+        self.primeira_da_linha = primeira_da_linha
+        self.compilado = re.compile(regex, flags)
+
+    def como_alternativa(self) -> str:
+        # Flags locais para que cada padrão mantenha seu comportamento dentro da regex combinada.
+        locais = "".join(letra for flag, letra in ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"))
+                         if self.flags & flag)
+        return f"(?{locais}:{self.regex})" if locais else f"(?:{self.regex})"
+
+
+class Campo:
+    def __init__(self, nome: str, padroes: list, conversor: Optional[Callable] = None,
+                 fonte: str = "texto", ultima_ocorrencia: bool = False):
+        self.nome = nome
+        self.padroes = [p if isinstance(p, Padrao) else Padrao(p) for p in padroes]
+        self.conversor = conversor
+        self.fonte = fonte
+        self.ultima_ocorrencia = ultima_ocorrencia
+
+    def converter(self, padrao: Padrao, match: re.Match):
+        valor = match.group(padrao.grupo)
+        conversor = padrao.conversor or self.conversor
+        return conversor(valor) if conversor else valor
+
+
+class EspecificacaoCampos:
+    def __init__(self, campos: list):
+        self.campos = campos
+        self._gatilhos = {}
+        for fonte in {campo.fonte for campo in campos}:
+            self._gatilho(self._entradas(fonte))
+
+    def _entradas(self, fonte: str) -> tuple:
+        return tuple(
+            (campo, prioridade, padrao)
+            for campo in self.campos if campo.fonte == fonte
+            for prioridade, padrao in enumerate(campo.padroes)
+        )
+
+    def _gatilho(self, entradas: tuple) -> re.Pattern:
+        chave = tuple(id(padrao) for _, _, padrao in entradas)
+        gatilho = self._gatilhos.get(chave)
+        if gatilho is None:
+            alternativas = "|".join(padrao.como_alternativa() for _, _, padrao in entradas)
+            gatilho = re.compile(f"(?=(?:{alternativas}))")
+            self._gatilhos[chave] = gatilho
+        return gatilho
+
+    def extrair(self, textos: dict, campos: Optional[set] = None) -> dict:
+        resultado = {}
+        for fonte in {campo.fonte for campo in self.campos}:
+            texto = textos.get(fonte)
+            if texto:
+                resultado.update(self._extrair_fonte(fonte, texto, campos))
+        return resultado
+
+    def _extrair_fonte(self, fonte: str, texto: str, campos: Optional[set]) -> dict:
+        # Uma única varredura: a regex combinada para em cada posição onde algum padrão pendente casa,
+        # reproduzindo o re.search individual de cada padrão (primeira ocorrência, prioridade por fallback).
+        pendentes = [e for e in self._entradas(fonte) if campos is None or e[0].nome in campos]
+        encontrados = {}
+        linhas_vistas = {}
+        posicao = 0
+
+        while pendentes:
+            # Com um único padrão pendente, o search dele mesmo aproveita a otimização de prefixo literal do re.
+            gatilho = pendentes[0][2].compilado if len(pendentes) == 1 else self._gatilho(tuple(pendentes))
+            match_gatilho = gatilho.search(texto, posicao)
+            if not match_gatilho:
+                break
+            inicio = match_gatilho.start()
+
+            for campo, prioridade, padrao in pendentes:
+                match = padrao.compilado.match(texto, inicio)
+                if not match:
+                    continue
+                if padrao.primeira_da_linha:
+                    inicio_linha = texto.rfind("\n", 0, inicio) + 1
+                    if linhas_vistas.get(id(padrao)) == inicio_linha:
+                        continue
+                    linhas_vistas[id(padrao)] = inicio_linha
+                try:
+                    valor = campo.converter(padrao, match)
+                except ValueError:
+                    if campo.ultima_ocorrencia:
+                        continue
+                    valor = None
+                atual = encontrados.get(campo.nome)
+                if atual is None or prioridade < atual[0] or (campo.ultima_ocorrencia and prioridade == atual[0]):
+                    encontrados[campo.nome] = (prioridade, valor)
+
+            pendentes = [
+                (campo, prioridade, padrao) for campo, prioridade, padrao in pendentes
+                if campo.nome not in encontrados
+                or prioridade < encontrados[campo.nome][0]
+                or (campo.ultima_ocorrencia and prioridade == encontrados[campo.nome][0])
+            ]
+            posicao = inicio + 1
+
+        return {nome: valor for nome, (_, valor) in encontrados.items()}
+
+
+def ler_paginas_necessarias(documento: DocumentoPdf, especificacao: EspecificacaoCampos,
+                            montar_textos: Callable[[DocumentoPdf], dict], campos: set) -> DocumentoPdf:
+    # Lê página a página e para assim que todos os campos informados tiverem valor.
+    # Cada verificação olha só as duas últimas páginas, para cobrir campos que atravessam a quebra de página.
+    lidas = []
+    preenchidos = set()
+    for texto_pagina in documento.iterar_paginas():
+        lidas.append(texto_pagina)
+        janela = DocumentoPdf.com_paginas(documento, lidas[-2:])
+        valores = especificacao.extrair(montar_textos(janela), campos - preenchidos)
+        preenchidos.update(nome for nome, valor in valores.items() if valor is not None)
+        if campos <= preenchidos:
+            documento.fechar()
+            break
+    return DocumentoPdf.com_paginas(documento, lidas)
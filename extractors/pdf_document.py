@@ -0,0 +1,120 @@
+# extractors/pdf_document.py
+import io
+import os
+import re
+from typing import Optional
+import pdfplumber
+
+from utils.memory_utils import rss_atual_mb
+
+
+class DocumentoPdf:
+    def __init__(self, caminho_pdf: str, conteudo: bytes, limite_memoria_mb: Optional[float] = None):
+        self.caminho_pdf = caminho_pdf
+        self.conteudo = conteudo
+        self.limite_memoria_mb = limite_memoria_mb
+        self.pico_memoria_mb = None
+        self._paginas_lidas = []
+        self._leitor = None
+        self._completo = False
+        self._texto = None
+        self._texto_normalizado = None
+        self._linhas = None
+
+    @classmethod
+    def carregar(cls, caminho_pdf: str) -> "DocumentoPdf":
+        limite = os.getenv("PDF_LIMITE_MEMORIA_MB")
+        with open(caminho_pdf, "rb") as f:
+            return cls(caminho_pdf, f.read(), float(limite) if limite else None)
+
+    @classmethod
+    def com_paginas(cls, origem: "DocumentoPdf", paginas: list) -> "DocumentoPdf":
+        documento = cls(origem.caminho_pdf, origem.conteudo)
+        documento._paginas_lidas = list(paginas)
+        documento._completo = True
+        return documento
+
+    def _registrar_memoria(self):
+        rss = rss_atual_mb()
+        self.pico_memoria_mb = rss if self.pico_memoria_mb is None else max(self.pico_memoria_mb, rss)
+        if self.limite_memoria_mb and rss > self.limite_memoria_mb:
+            raise MemoryError(
+                f"Leitura de '{os.path.basename(self.caminho_pdf)}' interrompida: "
+                f"{rss:.0f} MB em uso, limite de {self.limite_memoria_mb:.0f} MB."
+            )
+
+    def _gerar_paginas(self):
+        self._registrar_memoria()
+        with pdfplumber.open(io.BytesIO(self.conteudo)) as pdf:
+            for pagina in pdf.pages:
+                texto = pagina.extract_text() or ""
+                self._liberar_pagina(pagina)
+                self._registrar_memoria()
+                yield texto
+
+    @staticmethod
+    def _liberar_pagina(pagina):
+        # Descarta layout, objetos e o textmap em cache da página já lida; só o texto permanece em memória.
+        if hasattr(pagina, "close"):
+            pagina.close()
+            return
+        pagina.flush_cache()
+        cache_textmap = getattr(pagina.get_textmap, "cache_clear", None)
+        if cache_textmap:
+            cache_textmap()
+
+    def _ler_proxima_pagina(self) -> bool:
+        if self._completo:
+            return False
+        if self._leitor is None:
+            self._leitor = self._gerar_paginas()
+        try:
+            self._paginas_lidas.append(next(self._leitor))
+            return True
+        except StopIteration:
+            self._completo = True
+            self._leitor = None
+            return False
+
+    def pagina(self, indice: int) -> Optional[str]:
+        while len(self._paginas_lidas) <= indice and self._ler_proxima_pagina():
+            pass
+        return self._paginas_lidas[indice] if indice < len(self._paginas_lidas) else None
+
+    def iterar_paginas(self):
+        indice = 0
+        while True:
+            texto = self.pagina(indice)
+            if texto is None:
+                return
+            yield texto
+            indice += 1
+
+    def fechar(self):
+        if self._leitor is not None:
+            self._leitor.close()
+            self._leitor = None
+
+    @property
+    def paginas(self) -> list:
+        while self._ler_proxima_pagina():
+            pass
+        return self._paginas_lidas
+
+    @property
+    def texto(self) -> str:
+        if self._texto is None:
+            self._texto = "".join(t + "\n" for t in self.paginas if t)
+        return self._texto
+
+    @property
+    def texto_normalizado(self) -> str:
+        if self._texto_normalizado is None:
+            self._texto_normalizado = re.sub(r'\s+', ' ', self.texto).strip()
+        return self._texto_normalizado
+
+    @property
+    def linhas(self) -> list:
+        if self._linhas is None:
+            self._linhas = self.texto.splitlines()
+        return self._linhas
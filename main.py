@@ -1,9 +1,15 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
-from models.invoice_model import Base
+from sqlalchemy.exc import SQLAlchemyError
+from models.invoice_model import Base, criar_indice_chave_fatura
 from config.database_engine import engine
+from processors.invoice_batch_writer import indice_unico_disponivel
 from apps.vivo_automation_app import ApplicationVivo
 from apps.claro_automation_app import ClaroAutomationApp
-from config.logger_config import setup_logging
+from config.logger_config import setup_logging, definir_prefixo_log
 
 load_dotenv()
 
@@ -12,18 +18,94 @@ logger = setup_logging()
 Base.metadata.create_all(bind=engine)
 logger.info("Tabela 'faturas' criada ou verificada com sucesso.")
 
-def main():
-    logger.info("Iniciando automação Vivo...\n")
-    vivo_app = ApplicationVivo()
-    vivo_app.run()
-    logger.info("Automação Vivo finalizada.\n")
-
-    logger.info("Iniciando automação Claro...")
-    claro_app = ClaroAutomationApp()
-    claro_app.run()
-    logger.info("Automação Claro finalizada.\n")
-        
+# O índice único fica fora do create_all: sua sintaxe depende da versão do Postgres.
+try:
+    criar_indice_chave_fatura(engine)
+except SQLAlchemyError as e:
+    logger.warning(
+        "Não foi possível criar o índice único de faturas (verifique faturas duplicadas); "
+        f"a gravação seguirá fatura a fatura. Erro: {type(e).__name__}"
+    )
+# Verifica uma vez, antes dos processos filhos, se a gravação em lote (ON CONFLICT) pode ser usada.
+indice_unico_disponivel(engine)
+
+OPERADORAS = ("VIVO", "CLARO")
+
+
+def executar_operadora(operadora: str, aguardar_confirmacao: bool = True) -> dict:
+    logger.info(f"Iniciando automação {operadora.capitalize()}...\n")
+    inicio = time.perf_counter()
+    if operadora == "VIVO":
+        resumo = ApplicationVivo().run()
+    else:
+        resumo = ClaroAutomationApp().run(aguardar_confirmacao)
+    resumo["duracao_s"] = time.perf_counter() - inicio
+    logger.info(f"Automação {operadora.capitalize()} finalizada.\n")
+    return resumo
+
+
+def _executar_operadora_isolada(operadora: str) -> dict:
+    # Processo filho: as conexões herdadas do processo pai não podem ser reutilizadas aqui.
+    engine.dispose(close=False)
+    definir_prefixo_log(operadora)
+    return executar_operadora(operadora, aguardar_confirmacao=False)
+
+
+def executar_sequencial() -> list:
+    return [executar_operadora(operadora) for operadora in OPERADORAS]
+
+
+def executar_concorrente() -> list:
+    # Cada operadora roda em seu próprio processo, com driver, perfil e pasta de download próprios.
+    resumos = []
+    with ProcessPoolExecutor(max_workers=len(OPERADORAS)) as executor:
+        futuros = {operadora: executor.submit(_executar_operadora_isolada, operadora) for operadora in OPERADORAS}
+        for operadora, futuro in futuros.items():
+            try:
+                resumos.append(futuro.result())
+            except Exception as e:
+                logger.error(f"Processo da automação {operadora.capitalize()} falhou. Erro: {type(e).__name__}")
+                resumos.append({
+                    "operadora": operadora, "sucesso": False, "erro": f"{type(e).__name__}: {e}",
+                    "ingestao": None, "duracao_s": None
+                })
+    return resumos
+
+
+def _registrar_resumo_execucao(resumos: list, modo: str, duracao_total: float):
+    mensagem = f"Resumo da execução ({modo}, {duracao_total:.0f} s no total):\n"
+    for resumo in resumos:
+        situacao = "sucesso" if resumo["sucesso"] else f"falha ({resumo['erro']})"
+        duracao = f"{resumo['duracao_s']:.0f} s" if resumo.get("duracao_s") is not None else "N/A"
+        mensagem += f"   - {resumo['operadora']}: {situacao}, {duracao}"
+        ingestao = resumo.get("ingestao")
+        if ingestao:
+            mensagem += (
+                f", {ingestao['arquivos']} PDF(s), {ingestao['inseridas']} inserida(s), "
+                f"{ingestao['existentes']} existente(s), {len(ingestao['falhas'])} falha(s)"
+            )
+        mensagem += "\n"
+    logger.info(mensagem)
+
+
+def main(modo: str = None):
+    modo = (modo or os.getenv("EXECUCAO_MODO", "sequencial")).lower()
+    inicio = time.perf_counter()
+
+    if modo == "concorrente":
+        resumos = executar_concorrente()
+    else:
+        resumos = executar_sequencial()
+
+    _registrar_resumo_execucao(resumos, modo, time.perf_counter() - inicio)
     logger.info("Serviço de faturas concluído.")
+    return resumos
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Automação de download e cadastro de faturas Vivo e Claro.")
+    parser.add_argument(
+        "--modo", choices=("sequencial", "concorrente"),
+        help="Executa as operadoras uma após a outra ou ao mesmo tempo (padrão: EXECUCAO_MODO ou sequencial)."
+    )
+    main(parser.parse_args().modo)
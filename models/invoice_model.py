@@ -1,15 +1,27 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Numeric, Date, Text, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Numeric, Date, Text, DateTime, Uuid, inspect, text
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
+CAMPOS_OBRIGATORIOS_EXTRACAO = {
+    "numero_fatura",
+    "numero_contrato",
+    "numero_cnpj",
+    "data_emissao",
+    "data_vencimento",
+    "valor_total",
+}
+
+# Chave de negócio usada na deduplicação das faturas.
+CHAVE_FATURA = ("numero_fatura", "numero_contrato", "numero_cnpj")
+NOME_INDICE_CHAVE_FATURA = "uq_faturas_chave"
+
 class Fatura(Base):
     __tablename__ = "faturas"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
     operadora = Column(String(50), nullable=False)
     numero_contrato = Column(String(50), nullable=True)
     nome_fornecedor = Column(String(255), nullable=True)
@@ -30,3 +42,25 @@ class Fatura(Base):
     data_contabil = Column(Date, nullable=True)
     numero_fatura = Column(String(50), nullable=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+
+
+def criar_indice_chave_fatura(bind):
+    # Fora do create_all: NULLS NOT DISTINCT só existe a partir do Postgres 15. Nas versões anteriores
+    # (e no SQLite) o índice único trata nulos como distintos; faturas com campo da chave nulo já são
+    # deduplicadas fatura a fatura pelo gravador.
+    with bind.begin() as conexao:
+        nulos = ""
+        if conexao.dialect.name == "postgresql" and (conexao.dialect.server_version_info or (0,)) >= (15,):
+            nulos = " NULLS NOT DISTINCT"
+        conexao.execute(text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {NOME_INDICE_CHAVE_FATURA} "
+            f"ON {Fatura.__tablename__} ({', '.join(CHAVE_FATURA)}){nulos}"
+        ))
+
+
+def indice_chave_fatura_existe(bind) -> bool:
+    inspetor = inspect(bind)
+    unicos = [i["column_names"] for i in inspetor.get_indexes(Fatura.__tablename__) if i.get("unique")]
+    unicos += [r["column_names"] for r in inspetor.get_unique_constraints(Fatura.__tablename__)]
+    return any(set(colunas) == set(CHAVE_FATURA) for colunas in unicos)
@@ -1,5 +1,6 @@
 # claro_contract_card.py
 import logging, time
+from typing import Optional
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
@@ -14,11 +15,21 @@ from selenium.common.exceptions import (
 logger = logging.getLogger(__name__)
 
 class ContratoCard:
-    def __init__(self, driver, card_element: WebElement):
+    def __init__(self, driver, card_element: WebElement, numero: Optional[str] = None,
+                 encerrado: Optional[bool] = None, possui_selecionar: Optional[bool] = None):
+        # Valores já lidos no retrato da página (NavigationHelper.capturar_cards) dispensam novas consultas ao card.
         self.driver = driver
         self.card_element = card_element
+        self.numero = numero
+        self.encerrado = encerrado
+        self.possui_selecionar = possui_selecionar
 
     def esta_encerrado(self) -> bool:
+        if self.encerrado is not None:
+            if self.encerrado:
+                logger.info(f"Contrato '{self.obter_numero_contrato()}' está encerrado.")
+            return self.encerrado
+
         for tentativa in range(3):
             try:
                 span_inativo = WebDriverWait(self.card_element, 3).until(
@@ -40,6 +51,10 @@ class ContratoCard:
         return False
 
     def clicar_selecionar(self, tentativas=3) -> bool:
+        if self.possui_selecionar is False:
+            logger.warning(f"Contrato '{self.obter_numero_contrato()}' sem botão 'Selecionar'.")
+            return False
+
         for tentativa in range(1, tentativas + 1):
             try:
                 botao = WebDriverWait(self.card_element, 5).until(
@@ -75,6 +90,9 @@ class ContratoCard:
         return False
 
     def obter_numero_contrato(self) -> str:
+        if self.numero:
+            return self.numero
+
         for tentativa in range(3):
             try:
                 numero_div = self.card_element.find_element(By.CSS_SELECTOR, "div.mdn-Text.mdn-Text--body")
@@ -0,0 +1,68 @@
+# claro_contract_catalog.py
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogoContratos:
+    def __init__(self, caminho: Optional[str] = None):
+        # Cada entrada guarda onde o contrato está na listagem (página e posição do card, a partir de 1),
+        # para que o processamento e as novas tentativas vão direto a ele.
+        self.caminho = caminho
+        self.entradas = []
+        self._por_numero = {}
+
+    def registrar(self, numero: str, encerrado: bool, pagina: int, posicao: int) -> dict:
+        entrada = {
+            "numero": numero,
+            "encerrado": encerrado,
+            "pagina": pagina,
+            "posicao": posicao,
+            "situacao": "encerrado" if encerrado else "pendente",
+        }
+        self.entradas.append(entrada)
+        if numero in self._por_numero:
+            logger.warning(f"Contrato {numero} aparece mais de uma vez na listagem (página {pagina}, posição {posicao}).")
+        else:
+            self._por_numero[numero] = entrada
+        return entrada
+
+    def obter(self, numero: str) -> Optional[dict]:
+        return self._por_numero.get(numero)
+
+    def atualizar_situacao(self, entrada: dict, situacao: str):
+        entrada["situacao"] = situacao
+
+    def resumo(self) -> dict:
+        return {
+            "contratos": len(self.entradas),
+            "paginas": len({e["pagina"] for e in self.entradas}),
+            "encerrados": sum(1 for e in self.entradas if e["encerrado"]),
+        }
+
+    def salvar(self):
+        if not self.caminho:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            with open(self.caminho, "w", encoding="utf-8") as f:
+                json.dump({
+                    "atualizado_em": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "contratos": self.entradas,
+                }, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            logger.error(f"Erro ao salvar catálogo de contratos em '{self.caminho}': {e}")
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "CatalogoContratos":
+        catalogo = cls(caminho)
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        for e in dados.get("contratos", []):
+            entrada = catalogo.registrar(e["numero"], e["encerrado"], e["pagina"], e["posicao"])
+            entrada["situacao"] = e.get("situacao", entrada["situacao"])
+        return catalogo
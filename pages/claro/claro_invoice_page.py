@@ -7,223 +7,291 @@ from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+)
 
 from pages.claro.claro_contract_card import ContratoCard
-from processors.invoice_processor import FaturaService
+from pages.claro.claro_contract_catalog import CatalogoContratos
+from processors.ingestion_queue import ingerir_fatura
 from utils.json_failure_logger import JsonFailureLogger
+from utils.network_capture import obter_captura_rede, extrair_registros
 from pages.claro.claro_navigation_helper import NavigationHelper
+from utils.driver.driver_pool import driver_saudavel
 
 logger = logging.getLogger(__name__)
 
+# Situações do catálogo que uma retomada não processa de novo.
+SITUACOES_CONCLUIDAS = ("processado", "sem_faturas")
+
 
 class FaturaPage:
-    def __init__(self, driver, pasta_faturas: str, timeout: int = 15):
+    def __init__(self, driver, pasta_faturas: str, timeout: int = 15, caminho_catalogo: Optional[str] = None):
         self.driver = driver
         self.wait = WebDriverWait(driver, timeout)
         self.pasta_faturas = pasta_faturas
-        self.fatura_service = FaturaService(self.pasta_faturas)
 
         self.json_logger = JsonFailureLogger()
         self.navigation = NavigationHelper(self.driver, self.wait)
-
-    def processar_todos_contratos_ativos(self, callback_processamento: Callable[[str], Any], contratos_url: str):
+        self.caminho_catalogo = caminho_catalogo
+        self.catalogo = None
+
+    def _cards_da_resposta(self, dados) -> list:
+        # Converte a resposta da API de contratos no formato do retrato do DOM (NavigationHelper.capturar_cards).
+        campo_numero = os.getenv("CLARO_API_CAMPO_CONTRATO")
+        campo_status = os.getenv("CLARO_API_CAMPO_STATUS")
+        cards = []
+        for indice, registro in enumerate(extrair_registros(dados)):
+            if registro.get(campo_numero) is None:
+                return []
+            status = str(registro.get(campo_status) or "") if campo_status else ""
+            cards.append({
+                "indice": indice,
+                "numero": str(registro[campo_numero]).strip(),
+                "encerrado": "encerrado" in status.lower(),
+                "selecionar": True,
+                "exibido": True,
+            })
+        return cards
+
+    def catalogar_contratos(self, contratos_url: str,
+                            filtro_pagina: Optional[Callable[[int], bool]] = None) -> CatalogoContratos:
+        # Percorre a listagem uma única vez registrando número, status, página e posição de cada contrato.
+        catalogo = CatalogoContratos(self.caminho_catalogo)
         pagina_atual = 1
 
-        while True:
-            try:
-                self.navigation.aguardar_renderizacao_contratos()
-            except TimeoutException:
-                if not self.navigation.avancar_para_proxima_pagina(contratos_url, pagina_atual):
-                    break
-                pagina_atual += 1
-                continue
-
-            contratos_elements = self.driver.find_elements(By.CLASS_NAME, "contract")
-            total_na_pagina = len(contratos_elements)
-            logger.debug(f"Página {pagina_atual}: {total_na_pagina} contratos encontrados.")
+        # Com a captura de rede e o campo do número configurados, cada página é lida da resposta JSON da API,
+        # sem esperar a renderização dos cards; a página 1 já carregada corresponde à última resposta capturada.
+        captura = obter_captura_rede(self.driver, os.getenv("CLARO_API_CONTRATOS_PADRAO", r"contrat|contract"))
+        estruturado = captura is not None and bool(os.getenv("CLARO_API_CAMPO_CONTRATO"))
+        marca = max(captura.marcar() - 1, 0) if estruturado else None
 
-            for i in range(total_na_pagina):
+        while True:
+            cards = []
+            if estruturado:
+                cards = self._cards_da_resposta(captura.aguardar_resposta(marca, timeout=10))
+                if not cards:
+                    logger.info("Resposta da API de contratos não reconhecida; catálogo segue pelos cards da página.")
+                    estruturado = False
+
+            if not cards:
                 try:
-                    element = self.navigation.recapturar_elemento_card(i)
-                    if element is None:
-                        logger.warning(f"Elemento de contrato no índice {i} não encontrado (página {pagina_atual}). Avançando.")
-                        continue
-
-                    card = ContratoCard(self.driver, element)
-
-                    if card.esta_encerrado():
-                        dados_falha = {
-                            "contrato": card.obter_numero_contrato(),
-                            "pagina": pagina_atual,
-                            "posicao": i + 1,
-                            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "erro": "Contrato encerrado, nenhuma fatura disponível"
-                        }
-                        self.json_logger.registrar_falha_claro(dados_falha)
-
-                        continue
+                    cards = self.navigation.aguardar_renderizacao_contratos()
+                except TimeoutException:
+                    if not self.navigation.avancar_para_proxima_pagina(contratos_url, pagina_atual):
+                        break
+                    pagina_atual += 1
+                    continue
 
-                    if not card.clicar_selecionar():
-                        dados_falha = {
-                            "contrato": card.obter_numero_contrato(),
-                            "pagina": pagina_atual,
-                            "posicao": i + 1,
-                            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "erro": "Não foi possível clicar no botão 'Selecionar'."
-                        }
-                        self.json_logger.registrar_falha_claro(dados_falha)
+            # Páginas atribuídas a outro worker são apenas atravessadas.
+            if filtro_pagina is None or filtro_pagina(pagina_atual):
+                logger.debug(f"Página {pagina_atual}: {len(cards)} contratos encontrados.")
+                for card in cards:
+                    numero = card["numero"] or "contrato_desconhecido"
+                    if card["encerrado"]:
+                        logger.info(f"Contrato '{numero}' está encerrado.")
+                    catalogo.registrar(numero, card["encerrado"], pagina_atual, card["indice"] + 1)
+
+            marca = captura.marcar() if estruturado else None
+            if not self.navigation.avancar_para_proxima_pagina(contratos_url, pagina_atual, aguardar_cards=not estruturado):
+                break
+            pagina_atual += 1
 
-                        continue
+        resumo = catalogo.resumo()
+        logger.info(
+            f"Catálogo de contratos: {resumo['contratos']} contrato(s) em {resumo['paginas']} página(s), "
+            f"{resumo['encerrados']} encerrado(s)."
+        )
+        catalogo.salvar()
+        return catalogo
+
+    def carregar_catalogo(self, caminho: str, filtro_pagina: Optional[Callable[[int], bool]] = None) -> CatalogoContratos:
+        # Reaproveita um catálogo salvo (retomada), mantendo a situação de cada contrato; o progresso
+        # desta execução é gravado no catálogo próprio dela.
+        salvo = CatalogoContratos.carregar(caminho)
+        catalogo = CatalogoContratos(self.caminho_catalogo or caminho)
+        for e in salvo.entradas:
+            if filtro_pagina is None or filtro_pagina(e["pagina"]):
+                entrada = catalogo.registrar(e["numero"], e["encerrado"], e["pagina"], e["posicao"])
+                entrada["situacao"] = e["situacao"]
+        concluidos = sum(1 for e in catalogo.entradas if e["situacao"] in SITUACOES_CONCLUIDAS)
+        logger.info(f"Catálogo de contratos carregado de '{caminho}': {len(catalogo.entradas)} contrato(s), {concluidos} já concluído(s).")
+        catalogo.salvar()
+        return catalogo
+
+    def processar_todos_contratos_ativos(self, callback_processamento: Callable[[str], Any], contratos_url: str,
+                                         filtro_pagina: Optional[Callable[[int], bool]] = None,
+                                         catalogo_salvo: Optional[str] = None):
+        if catalogo_salvo:
+            self.catalogo = self.carregar_catalogo(catalogo_salvo, filtro_pagina)
+        else:
+            self.catalogo = self.catalogar_contratos(contratos_url, filtro_pagina)
+
+        # Página da listagem exibida no momento (None fora da listagem) e página de onde o último
+        # contrato foi aberto, para a qual o histórico do navegador pode voltar.
+        pagina_exibida = None
+        pagina_origem = None
+        assinatura_pagina = None
+
+        for entrada in self.catalogo.entradas:
+            if entrada["situacao"] in SITUACOES_CONCLUIDAS:
+                continue
+            if entrada["encerrado"]:
+                self._registrar_falha_contrato(entrada, "Contrato encerrado, nenhuma fatura disponível")
+                continue
 
-                    numero_contrato = card.obter_numero_contrato()
-
-                    try:
-                        no_invoices = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.no-invoices p")))
-                        mensagem = no_invoices.text.strip()
-                        dados_falha = {
-                            "contrato": numero_contrato,
-                            "pagina": pagina_atual,
-                            "posicao": i + 1,
-                            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "erro": mensagem
-                        }
-                        self.json_logger.registrar_falha_claro(dados_falha)
-
-                        self.navigation.voltar_para_pagina_contratos(contratos_url)
-                        for _ in range(pagina_atual - 1):
-                            if not self.navigation.avancar_para_proxima_pagina(contratos_url, pagina_atual):
-                                break
+            try:
+                if pagina_exibida != entrada["pagina"]:
+                    if pagina_exibida is None and pagina_origem == entrada["pagina"]:
+                        disponivel = self.navigation.retornar_para_pagina(contratos_url, entrada["pagina"], assinatura_pagina)
+                    else:
+                        disponivel = self.navigation.ir_para_pagina(contratos_url, entrada["pagina"])
+                    if not disponivel:
+                        pagina_exibida = None
+                        pagina_origem = None
+                        self.catalogo.atualizar_situacao(entrada, "falha")
+                        self._registrar_falha_contrato(entrada, f"Página {entrada['pagina']} de contratos não encontrada.")
                         continue
-                    except TimeoutException:
-                        pass
-
-                    arquivos = []
-                    attempts = 0
-                    erro_callback = None
-
-                    while attempts < 3 and not arquivos:
-                        try:
-                            arquivos = callback_processamento(numero_contrato)
-                        except Exception as e:
-                            erro_callback = str(e)
-                            logger.warning(f"Tentativa {attempts+1}/3 falhou para contrato {numero_contrato}: {e}")
-                        attempts += 1
-
-                    if not arquivos:
-                        dados_falha = {
-                            "contrato": numero_contrato,
-                            "pagina": pagina_atual,
-                            "posicao": i + 1,
-                            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "erro": erro_callback if erro_callback else "Nenhum arquivo gerado após tentativas"
-                        }
-                        self.json_logger.registrar_falha_claro(dados_falha)
+                    pagina_exibida = entrada["pagina"]
+                    assinatura_pagina = self.navigation.assinatura_pagina()
 
-                    else:
-                        for arquivo in arquivos:
-                            self.fatura_service.processar_fatura_pdf(os.path.join(self.fatura_service.pasta_faturas, arquivo))
-
-                    self.navigation.voltar_para_pagina_contratos(contratos_url)
-                    for _ in range(pagina_atual - 1):
-                        if not self.navigation.avancar_para_proxima_pagina(contratos_url, pagina_atual):
-                            break
-
-                except StaleElementReferenceException:
-                    logger.warning(f"Elemento de contrato ficou obsoleto durante processamento (página {pagina_atual}, posição {i+1}). Registrando e prosseguindo.")
-                    dados_falha = {
-                        "contrato": "contrato_desconhecido",
-                        "pagina": pagina_atual,
-                        "posicao": i + 1,
-                        "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "erro": "Elemento de contrato ficou obsoleto (StaleElementReferenceException)"
-                    }
-                    self.json_logger.registrar_falha_claro(dados_falha)
+                card = self._localizar_card(entrada)
+                if card is None:
+                    self.catalogo.atualizar_situacao(entrada, "falha")
+                    self._registrar_falha_contrato(entrada, "Contrato não encontrado na página registrada no catálogo.")
+                    continue
 
+                if not card.clicar_selecionar():
+                    self.catalogo.atualizar_situacao(entrada, "falha")
+                    self._registrar_falha_contrato(entrada, "Não foi possível clicar no botão 'Selecionar'.")
                     continue
-                except Exception as e:
-                    dados_falha = {
-                        "contrato": card.obter_numero_contrato() if 'card' in locals() and card is not None else "desconhecido",
-                        "pagina": pagina_atual,
-                        "posicao": i + 1,
-                        "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "erro": str(e)
-                    }
-                    self.json_logger.registrar_falha_claro(dados_falha)
-
-                    try:
-                        self.navigation.voltar_para_pagina_contratos(contratos_url)
-                        for _ in range(pagina_atual - 1):
-                            if not self.navigation.avancar_para_proxima_pagina(contratos_url, pagina_atual):
-                                break
-                    except Exception:
-                        logger.warning("Falha ao tentar restaurar a página de contratos após erro.")
-
-            if not self.navigation.avancar_para_proxima_pagina(contratos_url, pagina_atual):
-                break
 
-            pagina_atual += 1
+                pagina_exibida = None
+                pagina_origem = entrada["pagina"]
+
+                situacao, erro = self._baixar_contrato(entrada["numero"], callback_processamento)
+                self.catalogo.atualizar_situacao(entrada, situacao)
+                if erro:
+                    self._registrar_falha_contrato(entrada, erro)
+
+            except StaleElementReferenceException:
+                logger.warning(f"Elemento de contrato ficou obsoleto durante processamento (página {entrada['pagina']}, posição {entrada['posicao']}). Registrando e prosseguindo.")
+                pagina_exibida = None
+                pagina_origem = None
+                self.catalogo.atualizar_situacao(entrada, "falha")
+                self._registrar_falha_contrato(entrada, "Elemento de contrato ficou obsoleto (StaleElementReferenceException)")
+            except Exception as e:
+                if isinstance(e, WebDriverException) and not driver_saudavel(self.driver):
+                    # Navegador perdido: o catálogo salvo permite retomar deste contrato em outro navegador.
+                    self.catalogo.salvar()
+                    raise
+                pagina_exibida = None
+                pagina_origem = None
+                self.catalogo.atualizar_situacao(entrada, "falha")
+                self._registrar_falha_contrato(entrada, str(e))
+
+        falhados = [e["numero"] for e in self.catalogo.entradas if e["situacao"] == "falha"]
+        max_tentativas = int(os.getenv("CLARO_TENTATIVAS_FALHADOS", "1"))
+        if falhados and max_tentativas > 0:
+            logger.info(f"Tentando novamente {len(falhados)} contrato(s) com falha.")
+            self._tentar_novamente_falhados(falhados, callback_processamento, contratos_url, max_tentativas)
+
+        self.catalogo.salvar()
+        self.navigation.registrar_estatisticas()
+
+    def _localizar_card(self, entrada: dict) -> Optional[ContratoCard]:
+        cards = [c for c in self.navigation.capturar_cards() if c["numero"] == entrada["numero"]]
+        if not cards:
+            return None
+
+        # Prefere a posição registrada no catálogo; se a listagem mudou, usa a nova posição do número.
+        card = next((c for c in cards if c["indice"] == entrada["posicao"] - 1), cards[0])
+        if card["indice"] != entrada["posicao"] - 1:
+            logger.info(f"Contrato {entrada['numero']} mudou de posição na página {entrada['pagina']}.")
+
+        element = self.navigation.recapturar_elemento_card(card["indice"])
+        if element is None:
+            return None
+        return ContratoCard(self.driver, element, numero=card["numero"], encerrado=card["encerrado"],
+                            possui_selecionar=card["selecionar"])
+
+    def _baixar_contrato(self, numero_contrato: str, callback_processamento: Callable[[str], Any]):
+        # Executado com o contrato já selecionado; retorna (situacao, erro).
+        try:
+            no_invoices = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.no-invoices p")))
+            return "sem_faturas", no_invoices.text.strip()
+        except TimeoutException:
+            pass
+
+        arquivos = []
+        attempts = 0
+        erro_callback = None
+
+        while attempts < 3 and not arquivos:
+            try:
+                arquivos = callback_processamento(numero_contrato)
+            except Exception as e:
+                erro_callback = str(e)
+                logger.warning(f"Tentativa {attempts+1}/3 falhou para contrato {numero_contrato}: {e}")
+            attempts += 1
+
+        if not arquivos:
+            return "falha", erro_callback if erro_callback else "Nenhum arquivo gerado após tentativas"
+
+        for arquivo in arquivos:
+            ingerir_fatura(os.path.join(self.pasta_faturas, arquivo))
+        return "processado", None
+
+    def _registrar_falha_contrato(self, entrada: dict, erro: str):
+        dados_falha = {
+            "contrato": entrada["numero"],
+            "pagina": entrada["pagina"],
+            "posicao": entrada["posicao"],
+            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "erro": erro
+        }
+        self.json_logger.registrar_falha_claro(dados_falha)
 
     def _tentar_novamente_falhados(self, contratos_falhados, callback_processamento, contratos_url, max_tentativas: int):
         contratos_nao_processados = list(contratos_falhados)
         for tentativa in range(max_tentativas):
             if not contratos_nao_processados:
-                return
+                break
             contratos_restantes = []
-            self.driver.get(contratos_url)
-            self.navigation.aguardar_renderizacao_contratos()
             for contrato_numero in contratos_nao_processados:
                 try:
-                    self._processar_contrato_unico(contrato_numero, callback_processamento)
-                except Exception:
+                    self._processar_contrato_unico(contrato_numero, callback_processamento, contratos_url)
+                except Exception as e:
+                    logger.warning(f"Nova tentativa {tentativa + 1}/{max_tentativas} falhou para contrato {contrato_numero}: {e}")
                     contratos_restantes.append(contrato_numero)
             contratos_nao_processados = contratos_restantes
 
-    def _processar_contrato_unico(self, numero_contrato, callback_processamento: Callable[[str], Any]):
-        while True:
-            try:
-                self.navigation.aguardar_renderizacao_contratos()
-            except TimeoutException:
-                break
-            for card_element in self.driver.find_elements(By.CLASS_NAME, "contract"):
-                card = ContratoCard(self.driver, card_element)
-                if card.obter_numero_contrato() == numero_contrato:
-                    if not card.clicar_selecionar():
-                        raise Exception(f"Não foi possível selecionar contrato {numero_contrato}")
-
-                    try:
-                        no_invoices = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.no-invoices p")))
-                        mensagem = no_invoices.text.strip()
-                        dados_falha = {
-                            "contrato": numero_contrato,
-                            "pagina": None,
-                            "posicao": None,
-                            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "erro": mensagem
-                        }
-                        self.json_logger.registrar_falha_claro(dados_falha)
-                        self.navigation.voltar_para_pagina_contratos(self.driver.current_url)
-                        return
-                    except TimeoutException:
-                        pass
-
-                    arquivos = []
-                    attempts = 0
-                    erro_callback = None
-                    while attempts < 3 and not arquivos:
-                        try:
-                            arquivos = callback_processamento(numero_contrato)
-                        except Exception as e:
-                            erro_callback = str(e)
-                            logger.warning(f"Tentativa {attempts+1}/3 falhou para contrato {numero_contrato}: {e}")
-                        attempts += 1
-
-                    if arquivos:
-                        for arquivo in arquivos:
-                            self.fatura_service.processar_fatura_pdf(os.path.join(self.fatura_service.pasta_faturas, arquivo))
-
-                    self.navigation.voltar_para_pagina_contratos(self.driver.current_url)
-                    return
-
-            if not self.navigation.avancar_para_proxima_pagina():
-                raise NoSuchElementException(f"Contrato {numero_contrato} não encontrado.")
+        if contratos_nao_processados:
+            logger.warning(f"{len(contratos_nao_processados)} contrato(s) seguem com falha após novas tentativas.")
+        if self.catalogo is not None:
+            self.catalogo.salvar()
+
+    def _processar_contrato_unico(self, numero_contrato, callback_processamento: Callable[[str], Any],
+                                  contratos_url: Optional[str] = None):
+        contratos_url = contratos_url or self.driver.current_url
+        if self.catalogo is None:
+            self.navigation.voltar_para_pagina_contratos(contratos_url)
+            self.catalogo = self.catalogar_contratos(contratos_url)
+
+        # Vai direto à página registrada no catálogo, sem percorrer a paginação procurando o contrato.
+        entrada = self.catalogo.obter(numero_contrato)
+        if entrada is None or not self.navigation.ir_para_pagina(contratos_url, entrada["pagina"]):
+            raise NoSuchElementException(f"Contrato {numero_contrato} não encontrado.")
+
+        card = self._localizar_card(entrada)
+        if card is None:
+            raise NoSuchElementException(f"Contrato {numero_contrato} não encontrado.")
+        if not card.clicar_selecionar():
+            raise Exception(f"Não foi possível selecionar contrato {numero_contrato}")
+
+        situacao, erro = self._baixar_contrato(numero_contrato, callback_processamento)
+        self.catalogo.atualizar_situacao(entrada, situacao)
+        if situacao == "sem_faturas":
+            self._registrar_falha_contrato(entrada, erro)
+        elif situacao == "falha":
+            raise Exception(erro)
@@ -6,6 +6,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from utils.driver.performance_profile import abrir_pagina, pagina_pronta
+
 logger = logging.getLogger(__name__)
 
 class LoginPage:
@@ -18,15 +20,13 @@ class LoginPage:
     def open_login_page(self, retries=3):
         for attempt in range(1, retries + 1):
             try:
-                self.driver.get(self.url)
+                abrir_pagina(self.driver, self.url)
                 self.wait.until(
                     EC.presence_of_element_located(
                         (By.XPATH, "//button[contains(@class,'mdn-Button--primaryInverse') and .//span[text()='Entrar']]")
                     )
                 )
-                WebDriverWait(self.driver, 10).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
+                WebDriverWait(self.driver, 10).until(pagina_pronta)
                 break
             except (TimeoutException, WebDriverException):
                 if attempt == retries:
@@ -53,9 +53,7 @@ class LoginPage:
         self.preencher_senha(senha)
         self.clicar_botao_acessar()
         
-        WebDriverWait(self.driver, 15).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
+        WebDriverWait(self.driver, 15).until(pagina_pronta)
         logger.info("Login concluído e página carregada com sucesso.")
 
     def click_entrar(self):
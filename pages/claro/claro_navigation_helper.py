@@ -1,27 +1,67 @@
+import os
 import time
 import logging
 from typing import Optional
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, WebDriverException
+
+from utils.driver.performance_profile import abrir_pagina
 
 logger = logging.getLogger(__name__)
 
 
+SELETOR_LINKS_PAGINACAO = ".mdn-Pagination-Link:not(.mdn-Pagination-Link--next):not(.mdn-Pagination-Link--prev)"
+
+# Lê todos os cards da página em uma única chamada: número, status encerrado, botão "Selecionar" e exibição.
+SCRIPT_CARDS_CONTRATOS = """
+return Array.from(document.getElementsByClassName('contract')).map(function (card, indice) {
+    var texto = card.querySelector('div.mdn-Text.mdn-Text--body');
+    var inativo = card.querySelector('span.contract__infos-inactive');
+    var status = inativo ? inativo.innerText.trim() : '';
+    var numero = texto ? texto.innerText.trim() : null;
+    if (numero !== null && status && texto.contains(inativo)) {
+        numero = numero.replace(status, '').trim();
+    }
+    var estilo = window.getComputedStyle(card);
+    return {
+        indice: indice,
+        numero: numero,
+        encerrado: status.toLowerCase().indexOf('encerrado') !== -1,
+        selecionar: Array.from(card.querySelectorAll('button')).some(function (b) {
+            return b.textContent.indexOf('Selecionar') !== -1;
+        }),
+        exibido: card.getClientRects().length > 0 && estilo.visibility !== 'hidden'
+    };
+});
+"""
+
+
 class NavigationHelper:
     def __init__(self, driver, wait):
         self.driver = driver
         self.wait = wait
+        # Ex.: https://.../contratos?page={pagina} — quando o portal aceitar endereçar a página pela URL.
+        self.url_pagina_template = os.getenv("CLARO_CONTRATOS_URL_PAGINA")
+        self.carregamentos = 0
+        self.cliques_paginacao = 0
+        self.retornos_historico = 0
+        self.historico_disponivel = True
 
-    def aguardar_renderizacao_contratos(self):
-        try:
-            self.wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "contract")))
-            self.wait.until(lambda d: all(el.is_displayed() for el in d.find_elements(By.CLASS_NAME, "contract")))
-        except TimeoutException:
-            raise
+    def capturar_cards(self) -> list:
+        return self.driver.execute_script(SCRIPT_CARDS_CONTRATOS) or []
+
+    def aguardar_renderizacao_contratos(self) -> list:
+        # Cada verificação é um único script; retorna o retrato dos cards já exibidos.
+        def cards_exibidos(_):
+            cards = self.capturar_cards()
+            return cards if cards and all(c["exibido"] for c in cards) else False
 
-    def avancar_para_proxima_pagina(self, contratos_url: Optional[str] = None, pagina_atual: Optional[int] = None) -> bool:
+        return self.wait.until(cards_exibidos)
+
+    def avancar_para_proxima_pagina(self, contratos_url: Optional[str] = None, pagina_atual: Optional[int] = None,
+                                    aguardar_cards: bool = True) -> bool:
         try:
             next_btn = self.wait.until(
                 EC.element_to_be_clickable(
@@ -29,8 +69,10 @@ class NavigationHelper:
                 )
             )
             self.driver.execute_script("arguments[0].click();", next_btn)
+            self.cliques_paginacao += 1
             self.wait.until(EC.staleness_of(next_btn))
-            self.aguardar_renderizacao_contratos()
+            if aguardar_cards:
+                self.aguardar_renderizacao_contratos()
             logger.debug(f"Avançou para a próxima página (última conhecida: {pagina_atual}).")
             return True
         except TimeoutException:
@@ -45,16 +87,92 @@ class NavigationHelper:
 
     def voltar_para_pagina_contratos(self, contratos_url: str):
         try:
-            self.driver.get(contratos_url)
+            abrir_pagina(self.driver, contratos_url)
+            self.carregamentos += 1
             self.aguardar_renderizacao_contratos()
         except Exception:
             try:
-                self.driver.get(contratos_url)
+                abrir_pagina(self.driver, contratos_url)
+                self.carregamentos += 1
                 self.aguardar_renderizacao_contratos()
             except Exception as e:
                 logger.error(f"Erro ao voltar para página de contratos: {e}")
                 raise
 
+    def assinatura_pagina(self) -> str:
+        # Texto de todos os cards em uma única chamada; identifica a página de contratos renderizada.
+        return self.driver.execute_script(
+            "return Array.from(document.getElementsByClassName('contract')).map(e => e.innerText).join('|');"
+        )
+
+    def retornar_para_pagina(self, contratos_url: str, pagina: int, assinatura: Optional[str] = None) -> bool:
+        # Tenta o histórico do navegador primeiro; só confia nele se a lista voltar com os mesmos cards.
+        if assinatura and self.historico_disponivel:
+            try:
+                self.driver.back()
+                self.retornos_historico += 1
+                self.aguardar_renderizacao_contratos()
+                if self.assinatura_pagina() == assinatura:
+                    return True
+            except (TimeoutException, WebDriverException):
+                pass
+            # O portal não restaurou a lista: não insiste no histórico pelo resto da execução.
+            logger.info("Histórico do navegador não restaura a página de contratos; usando navegação direta.")
+            self.historico_disponivel = False
+        return self.ir_para_pagina(contratos_url, pagina)
+
+    def ir_para_pagina(self, contratos_url: str, pagina: int) -> bool:
+        # Volta à lista já na página desejada: pela URL, se configurada, ou saltando pelos links numerados
+        # da paginação, em vez de clicar em "próxima" (pagina - 1) vezes.
+        if self.url_pagina_template and pagina > 1:
+            try:
+                self.voltar_para_pagina_contratos(self.url_pagina_template.format(pagina=pagina))
+                return True
+            except Exception:
+                logger.warning(f"Endereçamento direto da página {pagina} falhou; usando a paginação.")
+
+        self.voltar_para_pagina_contratos(contratos_url)
+        atual = 1
+        while atual < pagina:
+            salto = self._saltar_para_link_numerado(atual, pagina)
+            if salto is not None:
+                atual = salto
+            elif self.avancar_para_proxima_pagina(contratos_url, atual):
+                atual += 1
+            else:
+                return False
+        return True
+
+    def _saltar_para_link_numerado(self, atual: int, alvo: int) -> Optional[int]:
+        # Maior link numerado visível entre a página atual e a página alvo.
+        candidatos = {}
+        for link in self.driver.find_elements(By.CSS_SELECTOR, SELETOR_LINKS_PAGINACAO):
+            try:
+                texto = link.text.strip()
+            except StaleElementReferenceException:
+                continue
+            if texto.isdigit() and atual < int(texto) <= alvo:
+                candidatos[int(texto)] = link
+        if not candidatos:
+            return None
+
+        numero = max(candidatos)
+        link = candidatos[numero]
+        try:
+            self.driver.execute_script("arguments[0].click();", link)
+            self.cliques_paginacao += 1
+            self.wait.until(EC.staleness_of(link))
+            self.aguardar_renderizacao_contratos()
+            return numero
+        except (TimeoutException, StaleElementReferenceException):
+            return None
+
+    def registrar_estatisticas(self):
+        logger.info(
+            f"Navegação de contratos: {self.carregamentos} carregamento(s) da lista, "
+            f"{self.cliques_paginacao} clique(s) de paginação, {self.retornos_historico} retorno(s) pelo histórico."
+        )
+
     def recapturar_elemento_card(self, index: int, max_retries: int = 3, delay: float = 0.5):
         for attempt in range(max_retries):
             try:
@@ -7,14 +7,83 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 import locale
+import os
+
+from utils.driver.cdp_download_manager import marcar_download
+from utils.http_download_client import obter_cliente_http
 
 logger = logging.getLogger(__name__)
 locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
 
+# Clica na primeira aba (li) cujo texto contém o mês e o ano informados; retorna false se ainda não existir.
+SCRIPT_CLICAR_ABA_MES = """
+var mes = arguments[0], ano = arguments[1];
+var aba = Array.from(document.getElementsByTagName('li')).find(function (li) {
+    var texto = li.textContent.toLowerCase();
+    return texto.indexOf(mes) !== -1 && texto.indexOf(ano) !== -1;
+});
+if (!aba) return false;
+aba.scrollIntoView({block: 'center'});
+aba.click();
+return true;
+"""
+
+# Todas as faturas exibidas em uma única leitura: título, status e se há link "Selecionar".
+SCRIPT_LISTAR_FATURAS = """
+return Array.from(document.getElementsByClassName('invoice-list-item')).map(function (item, indice) {
+    var titulo = item.querySelector('.invoice-list-item__content-infos-text--title');
+    var status = item.querySelector('.status-tag');
+    return {
+        indice: indice,
+        titulo: titulo ? titulo.innerText : '',
+        status: status ? status.innerText : '',
+        selecionar: Array.from(item.getElementsByTagName('a')).some(function (a) {
+            return a.textContent.indexOf('Selecionar') !== -1;
+        })
+    };
+});
+"""
+
+SCRIPT_CLICAR_SELECIONAR = """
+var item = document.getElementsByClassName('invoice-list-item')[arguments[0]];
+if (!item) return false;
+var link = Array.from(item.getElementsByTagName('a')).find(function (a) {
+    return a.textContent.indexOf('Selecionar') !== -1;
+});
+if (!link) return false;
+link.scrollIntoView({block: 'center'});
+link.click();
+return true;
+"""
+
+# Clica no link de download ainda não usado nesta visita e retorna o nome do arquivo.
+SCRIPT_CLICAR_DOWNLOAD = """
+var baixados = arguments[0];
+var link = Array.from(document.querySelectorAll('[data-testid="download-invoice"]')).find(function (a) {
+    return baixados.indexOf(a.getAttribute('download')) === -1;
+});
+if (!link) return null;
+var nome = link.getAttribute('download');
+link.click();
+return nome;
+"""
+
+# Nome do arquivo e endereço do link de download ainda não usado nesta visita, sem clicar.
+SCRIPT_LER_DOWNLOAD = """
+var baixados = arguments[0];
+var link = Array.from(document.querySelectorAll('[data-testid="download-invoice"]')).find(function (a) {
+    return baixados.indexOf(a.getAttribute('download')) === -1;
+});
+return link ? {nome: link.getAttribute('download'), href: link.href} : null;
+"""
+
 class FaturasPendentesPage:
-    def __init__(self, driver, timeout=30):
+    def __init__(self, driver, timeout=30, download_dir: Optional[str] = None):
         self.driver = driver
+        self.download_dir = download_dir
         self.wait = WebDriverWait(driver, timeout)
+        # Marca CDP de cada download disparado na última visita (nome -> marca), quando habilitado.
+        self.marcas_download = {}
 
     def _obter_mes_ano_atual_e_anterior(self) -> Tuple[Tuple[str,int], Tuple[str,int]]:
         hoje = datetime.today()
@@ -27,51 +96,86 @@ class FaturasPendentesPage:
         return texto.strip().lower()
 
     def _clicar_aba_mes(self, mes, ano) -> bool:
-        xpath_aba = f"//li[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{mes}') and contains(., '{ano}')]"
         try:
-            aba = self.wait.until(EC.element_to_be_clickable((By.XPATH, xpath_aba)))
-            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", aba)
-            self.driver.execute_script("arguments[0].click();", aba)
-            return True
+            return self.wait.until(lambda d: d.execute_script(SCRIPT_CLICAR_ABA_MES, mes, str(ano)))
         except TimeoutException:
             return False
 
-    def _buscar_faturas_pendentes(self, mes, ano) -> List:
-        try: 
-            self.wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "invoice-list-item")))
-        except TimeoutException: 
+    def _listar_faturas(self) -> List[dict]:
+        try:
+            return self.wait.until(lambda d: d.execute_script(SCRIPT_LISTAR_FATURAS) or False)
+        except TimeoutException:
             return []
-        
-        faturas_pendentes = []
+
+    def _buscar_faturas_pendentes(self, mes, ano) -> List[dict]:
         mes_ano_str = f"{mes} {ano}".lower()
-        
-        for f in self.driver.find_elements(By.CLASS_NAME, "invoice-list-item"):
-            try:
-                titulo = self._normalizar_texto(f.find_element(By.CLASS_NAME, "invoice-list-item__content-infos-text--title").text)
-                status_texto = self._normalizar_texto(f.find_element(By.CLASS_NAME, "status-tag").text)
-                
-                if mes_ano_str in titulo and (status_texto == 'aguardando' or status_texto == 'vencida'): 
-                    faturas_pendentes.append(f)
-            except Exception: 
-                continue
-        
+        faturas_pendentes = []
+        for f in self._listar_faturas():
+            titulo = self._normalizar_texto(f["titulo"])
+            status_texto = self._normalizar_texto(f["status"])
+            if mes_ano_str in titulo and (status_texto == 'aguardando' or status_texto == 'vencida') and f["selecionar"]:
+                faturas_pendentes.append(f)
         return faturas_pendentes
 
-    def selecionar_e_baixar_fatura(self) -> Optional[str]:
+    def _voltar_para_lista(self, mes, ano) -> bool:
+        # Se a seleção saiu da lista de faturas, volta e reabre a aba do mês para a próxima fatura.
+        if self.driver.execute_script(SCRIPT_LISTAR_FATURAS):
+            return True
+        self.driver.back()
+        return self._clicar_aba_mes(mes, ano) and bool(self._listar_faturas())
+
+    def _disparar_download(self, nomes_arquivos: List[str], cliente, via_http: dict, mes, ano, indice) -> str:
+        # Com HTTP direto, o link é só lido e o PDF baixado em segundo plano; senão, o link é clicado.
+        if cliente is not None:
+            link = self.wait.until(lambda d: d.execute_script(SCRIPT_LER_DOWNLOAD, nomes_arquivos))
+            if cliente.aceita(link["href"]):
+                futuro = cliente.enviar(link["href"], os.path.join(self.download_dir, link["nome"]))
+                via_http[link["nome"]] = (futuro, mes, ano, indice)
+                return link["nome"]
+
+        marca = marcar_download(self.driver)
+        nome_arquivo = self.wait.until(lambda d: d.execute_script(SCRIPT_CLICAR_DOWNLOAD, nomes_arquivos))
+        self.marcas_download[nome_arquivo] = marca
+        return nome_arquivo
+
+    def _concluir_downloads_http(self, nomes_arquivos: List[str], via_http: dict):
+        # Downloads HTTP que falharam são refeitos pela interface, ainda nesta visita ao contrato.
+        for nome_arquivo, (futuro, mes, ano, indice) in via_http.items():
+            if futuro.result():
+                continue
+            logger.info(f"Download HTTP da fatura '{nome_arquivo}' falhou; baixando pela interface.")
+            try:
+                if self._clicar_aba_mes(mes, ano) and self.driver.execute_script(SCRIPT_CLICAR_SELECIONAR, indice):
+                    outros = [n for n in nomes_arquivos if n != nome_arquivo]
+                    marca = marcar_download(self.driver)
+                    self.wait.until(lambda d: d.execute_script(SCRIPT_CLICAR_DOWNLOAD, outros))
+                    self.marcas_download[nome_arquivo] = marca
+                self._voltar_para_lista(mes, ano)
+            except Exception:
+                logger.warning(f"Não foi possível baixar a fatura '{nome_arquivo}'.")
+
+    def selecionar_e_baixar_faturas(self) -> List[str]:
+        # Dispara o download de todas as faturas pendentes do mês atual e do anterior, sem esperar
+        # cada arquivo terminar; retorna os nomes para que a conclusão seja aguardada depois.
+        nomes_arquivos = []
+        via_http = {}
+        self.marcas_download = {}
+        cliente = obter_cliente_http(self.driver) if self.download_dir else None
         (mes_atual, ano_atual), (mes_anterior, ano_anterior) = self._obter_mes_ano_atual_e_anterior()
         for mes, ano in [(mes_atual, ano_atual), (mes_anterior, ano_anterior)]:
-            if self._clicar_aba_mes(mes, ano):
-                faturas = self._buscar_faturas_pendentes(mes, ano)
-                if faturas:
-                    f = faturas[0]
-                    try:
-                        botao = f.find_element(By.XPATH, ".//a[contains(text(), 'Selecionar')]")
-                        self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", botao)
-                        self.wait.until(EC.element_to_be_clickable(botao)).click()
-                        download_link = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="download-invoice"]')))
-                        nome_arquivo = download_link.get_attribute("download")
-                        self.driver.execute_script("arguments[0].click();", download_link)
-                        return nome_arquivo
-                    except Exception: 
+            if not self._clicar_aba_mes(mes, ano):
+                continue
+            for f in self._buscar_faturas_pendentes(mes, ano):
+                try:
+                    if not self.driver.execute_script(SCRIPT_CLICAR_SELECIONAR, f["indice"]):
                         continue
-        return None
+                    nome_arquivo = self._disparar_download(nomes_arquivos, cliente, via_http, mes, ano, f["indice"])
+                    nomes_arquivos.append(nome_arquivo)
+                    logger.info(f"Download da fatura '{nome_arquivo}' iniciado.")
+                except Exception:
+                    logger.warning(f"Não foi possível baixar a fatura '{self._normalizar_texto(f['titulo'])}'.")
+                if not self._voltar_para_lista(mes, ano):
+                    break
+
+        self._concluir_downloads_http(nomes_arquivos, via_http)
+        return nomes_arquivos
@@ -1,6 +1,6 @@
 import os
+import re
 import time
-import json
 import logging
 from datetime import datetime
 from selenium.webdriver.common.by import By
@@ -14,14 +14,60 @@ from selenium.common.exceptions import (
 )
 
 from utils.vivo_file_utils import wait_for_download_file, move_file, extract_zip
-from processors.invoice_processor import FaturaService
+from processors.ingestion_queue import ingerir_fatura
+from utils.driver.cdp_download_manager import marcar_download
+from utils.http_download_client import obter_cliente_http
 from pages.vivo.vivo_logging import log_fatura
 from pages.vivo.vivo_menu_handler import process_invoice_menu_button
+from utils.json_failure_logger import anexar_registro_json
+from utils.network_capture import extrair_registros
 
 logger = logging.getLogger(__name__)
 
 FAILURE_FILE = "vivo_failures.json"
 
+DOWNLOAD_BUTTON = "Baixar agora"
+ZIP_BUTTON = "Todas em boleto (.zip)"
+PDF_BUTTON = "Boleto (.pdf)"
+HTTP_DOWNLOAD_SUBDIR = "http"
+
+# Reads every grid row in a single evaluation: customer, due date, paid flag, button labels and,
+# when the row exposes one, a direct link to the PDF.
+GRID_SNAPSHOT_SCRIPT = """
+return Array.from(document.querySelectorAll('div.mve-grid-row')).map(function (row, index) {
+    var customer = row.querySelector('div[data-test-secondary-info] span');
+    var due = row.querySelector('div[data-test-invoice-due-date]');
+    var pdf = Array.from(row.querySelectorAll('a[href]')).find(function (a) {
+        return /^https?:/i.test(a.href)
+            && (a.hasAttribute('download') || /\.pdf([?#]|$)/i.test(a.href) || a.textContent.indexOf('Boleto (.pdf)') !== -1);
+    });
+    return {
+        index: index,
+        customer: customer ? customer.innerText.trim() : null,
+        due_date: due ? due.innerText.trim() : null,
+        paid: row.querySelector('.invoice-due-date-label-paid') !== null,
+        buttons: Array.from(row.querySelectorAll('button')).map(function (b) { return b.textContent.trim(); }),
+        pdf_url: pdf ? pdf.href : null
+    };
+});
+"""
+
+# Clicks the first button of the row (by index) whose text contains one of the labels; returns that label.
+CLICK_ROW_BUTTON_SCRIPT = """
+var row = document.querySelectorAll('div.mve-grid-row')[arguments[0]];
+if (!row) return null;
+var buttons = Array.from(row.querySelectorAll('button'));
+for (var i = 0; i < arguments[1].length; i++) {
+    var label = arguments[1][i];
+    var button = buttons.find(function (b) { return b.textContent.indexOf(label) !== -1; });
+    if (button) {
+        button.click();
+        return label;
+    }
+}
+return null;
+"""
+
 def _extract_customer_code(pdf_name: str):
     try:
         parts = pdf_name.split("_")
@@ -44,27 +90,76 @@ def _register_failure(target_folder, page, position, pdf_name, error):
     }
 
     try:
-        existing = []
-        if os.path.exists(failure_path):
-            with open(failure_path, "r", encoding="utf-8") as f:
-                existing = json.load(f) or []
-        existing.append(failure_data)
-        with open(failure_path, "w", encoding="utf-8") as f:
-            json.dump(existing, f, ensure_ascii=False, indent=4)
+        anexar_registro_json(failure_path, failure_data)
     except Exception as e:
         logger.error(f"Erro ao registrar falha no JSON da Vivo: {e}")
 
+def _click_row_button(driver, row_index, *labels):
+    return driver.execute_script(CLICK_ROW_BUTTON_SCRIPT, row_index, list(labels))
+
+def _read_grid(driver):
+    return driver.execute_script(GRID_SNAPSHOT_SCRIPT) or False
+
+def _row_key(row):
+    return row["customer"], row["due_date"]
+
+def rows_from_api(payload):
+    # Converts the invoices API response into GRID_SNAPSHOT_SCRIPT's row format. Customer and due date fields
+    # must be configured; otherwise (or if any record lacks them) the page is read from the grid.
+    customer_field = os.getenv("VIVO_API_CAMPO_CLIENTE")
+    due_field = os.getenv("VIVO_API_CAMPO_VENCIMENTO")
+    if not customer_field or not due_field:
+        return []
+    paid_field = os.getenv("VIVO_API_CAMPO_PAGA")
+    pdf_field = os.getenv("VIVO_API_CAMPO_PDF")
+
+    rows = []
+    for index, record in enumerate(extrair_registros(payload)):
+        if record.get(customer_field) is None or record.get(due_field) is None:
+            return []
+        due_date = str(record[due_field]).strip()
+        iso = re.match(r"(\d{4})-(\d{2})-(\d{2})", due_date)
+        if iso:
+            due_date = f"{iso[3]}/{iso[2]}/{iso[1]}"
+        paid = record.get(paid_field) if paid_field else False
+        if isinstance(paid, str):
+            paid = paid.strip().lower() in ("1", "true", "sim", "pago", "paga", "paid")
+        pdf_url = record.get(pdf_field) if pdf_field else None
+        rows.append({
+            "index": index,
+            "customer": str(record[customer_field]).strip(),
+            "due_date": due_date,
+            "paid": bool(paid),
+            "buttons": [] if paid else [DOWNLOAD_BUTTON],
+            "pdf_url": pdf_url if isinstance(pdf_url, str) and re.match(r"https?:", pdf_url, re.IGNORECASE) else None,
+        })
+    return rows
+
+def _grid_positions(driver, rows, timeout=15):
+    # Rows built from the API carry the response order; clicks need each row's position in the rendered grid.
+    keys = {_row_key(r) for r in rows}
+    positions = {}
+
+    def rendered(d):
+        positions.clear()
+        positions.update({_row_key(r): r["index"] for r in _read_grid(d) or []})
+        return keys <= positions.keys()
+
+    try:
+        WebDriverWait(driver, timeout, 0.1).until(rendered)
+    except TimeoutException:
+        logger.warning(f"{len(keys - positions.keys())} fatura(s) da resposta da API não apareceram na grade.")
+    return positions
+
 def download_invoices_from_page(driver, popup_manager, download_dir, target_folder, cnpj,
                                 login_page=None, usuario=None, senha=None,
-                                reopen_customer_fn=None, skip_existing=True, page_number=1):
-
+                                reopen_customer_fn=None, skip_existing=True, page_number=1, rows=None):
+    # `rows` comes from the invoices API response (rows_from_api); without it the grid is read from the DOM.
+    from_api = bool(rows)
     attempts = 0
-    rows = []
-    while attempts < 2:
+    while not from_api and attempts < 2:
         try:
-            rows = WebDriverWait(driver, 15, 0.3).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.mve-grid-row"))
-            )
+            rows = WebDriverWait(driver, 15, 0.3).until(_read_grid)
             break
         except TimeoutException:
             attempts += 1
@@ -86,21 +181,20 @@ def download_invoices_from_page(driver, popup_manager, download_dir, target_fold
 
     popup_manager.handle_all()
 
-    def already_downloaded(invoice):
-        if not skip_existing:
-            return False
-        try:
-            customer = invoice.find_element(By.CSS_SELECTOR, "div[data-test-secondary-info] span").text.strip()
-            due = invoice.find_element(By.CSS_SELECTOR, "div[data-test-invoice-due-date]").text.strip().replace("/", "")
-            pdf_name = f"vivo_{customer}_{due}.pdf"
-            return os.path.exists(os.path.join(target_folder, pdf_name))
-        except Exception:
+    def pdf_name_for(row):
+        if not row["customer"] or not row["due_date"]:
+            return None
+        return f"vivo_{row['customer']}_{row['due_date'].replace('/', '')}.pdf"
+
+    def already_downloaded(row):
+        if not skip_existing or not pdf_name_for(row):
             return False
+        return os.path.exists(os.path.join(target_folder, pdf_name_for(row)))
 
     pending = [
         r for r in rows
-        if not r.find_elements(By.CSS_SELECTOR, ".invoice-due-date-label-paid")
-        and r.find_elements(By.XPATH, ".//button[contains(., 'Baixar agora')]")
+        if not r["paid"]
+        and any(DOWNLOAD_BUTTON in label for label in r["buttons"])
         and not already_downloaded(r)
     ]
 
@@ -111,26 +205,58 @@ def download_invoices_from_page(driver, popup_manager, download_dir, target_fold
     logger.info(f"Página {page_number}")
     total_page = len(pending)
 
+    # Fast path: rows with a direct PDF link are fetched in parallel over HTTP with the browser's cookies;
+    # anything that fails there goes through the click flow below.
+    fetched = {}
+    client = obter_cliente_http(driver)
+    direct = [r for r in pending if client is not None and client.aceita(r.get("pdf_url")) and pdf_name_for(r)]
+    if direct:
+        # Own subfolder: the click flow below scans download_dir for loose PDFs and must never see these.
+        http_dir = os.path.join(download_dir, HTTP_DOWNLOAD_SUBDIR)
+        os.makedirs(http_dir, exist_ok=True)
+        paths = [os.path.join(http_dir, f"{r['index']}_{pdf_name_for(r)}") for r in direct]
+        for row, path, ok in zip(direct, paths, client.baixar_varios([(r["pdf_url"], p) for r, p in zip(direct, paths)])):
+            if ok:
+                fetched[row["index"]] = path
+        logger.info(f"Página {page_number}: {len(fetched)}/{len(direct)} fatura(s) baixada(s) via HTTP.")
+
+    positions = None
     for i, invoice in enumerate(pending, 1):
-        pdf_name = "desconhecido.pdf"
-        try:
-            customer = invoice.find_element(By.CSS_SELECTOR, "div[data-test-secondary-info] span").text.strip()
-            due = invoice.find_element(By.CSS_SELECTOR, "div[data-test-invoice-due-date]").text.strip().replace("/", "")
-            pdf_name = f"vivo_{customer}_{due}.pdf"
-        except Exception:
-            pass
+        pdf_name = pdf_name_for(invoice) or "desconhecido.pdf"
+
+        if invoice["index"] in fetched:
+            final_path = move_file(fetched[invoice["index"]], target_folder, pdf_name, overwrite=False)
+            if final_path:
+                ingerir_fatura(final_path)
+                log_fatura(page_number, i, total_page, pdf_name, sucesso=True)
+                continue
+            if os.path.exists(fetched[invoice["index"]]):
+                os.remove(fetched[invoice["index"]])
+
+        row_index = invoice["index"]
+        if from_api:
+            if positions is None:
+                positions = _grid_positions(driver, [r for r in pending if r["index"] not in fetched])
+            row_index = positions.get(_row_key(invoice))
+            if row_index is None:
+                log_fatura(page_number, i, total_page, pdf_name, sucesso=False, motivo="linha não exibida na grade")
+                _register_failure(target_folder, page_number, i, pdf_name, "row not rendered in grid")
+                continue
 
         success = False
         for attempt in range(2):
             try:
                 before_files = set(os.listdir(download_dir))
-                btn = invoice.find_element(By.XPATH, ".//button[contains(., 'Baixar agora')]")
-                driver.execute_script("arguments[0].click();", btn)
+                marker = marcar_download(driver)
+                if not _click_row_button(driver, row_index, DOWNLOAD_BUTTON):
+                    raise StaleElementReferenceException(f"Grid row {row_index} is no longer available")
 
-                try:
-                    zip_btn = invoice.find_element(By.XPATH, ".//button[contains(., 'Todas em boleto (.zip)')]")
-                    driver.execute_script("arguments[0].click();", zip_btn)
-                    zip_name = wait_for_download_file(download_dir, before_files, extension=".zip")
+                option = _click_row_button(driver, row_index, ZIP_BUTTON, PDF_BUTTON)
+                if option is None:
+                    raise NoSuchElementException("No download option found for the invoice")
+
+                if option == ZIP_BUTTON:
+                    zip_name = wait_for_download_file(download_dir, before_files, extension=".zip", marker=marker)
                     if zip_name:
                         zip_path = os.path.join(download_dir, zip_name)
                         extract_zip(zip_path, download_dir)
@@ -141,7 +267,7 @@ def download_invoices_from_page(driver, popup_manager, download_dir, target_fold
                                 pdf_path = os.path.join(download_dir, f)
                                 final_path = move_file(pdf_path, target_folder, pdf_name, overwrite=False)
                                 if final_path:
-                                    FaturaService(target_folder).processar_fatura_pdf(final_path)
+                                    ingerir_fatura(final_path)
                                     log_fatura(page_number, i, total_page, pdf_name, sucesso=True)
                                 else:
                                     log_fatura(page_number, i, total_page, pdf_name, sucesso=False,
@@ -150,15 +276,13 @@ def download_invoices_from_page(driver, popup_manager, download_dir, target_fold
                         success = True
                         break
 
-                except NoSuchElementException:
-                    pdf_btn = invoice.find_element(By.XPATH, ".//button[contains(., 'Boleto (.pdf)')]")
-                    driver.execute_script("arguments[0].click();", pdf_btn)
-                    pdf_name_downloaded = wait_for_download_file(download_dir, before_files, extension=".pdf")
+                else:
+                    pdf_name_downloaded = wait_for_download_file(download_dir, before_files, extension=".pdf", marker=marker)
                     if pdf_name_downloaded:
                         pdf_path = os.path.join(download_dir, pdf_name_downloaded)
                         final_path = move_file(pdf_path, target_folder, pdf_name, overwrite=False)
                         if final_path:
-                            FaturaService(target_folder).processar_fatura_pdf(final_path)
+                            ingerir_fatura(final_path)
                             log_fatura(page_number, i, total_page, pdf_name, sucesso=True)
                         else:
                             log_fatura(page_number, i, total_page, pdf_name, sucesso=False,
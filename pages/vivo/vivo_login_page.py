@@ -5,6 +5,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from utils.driver.performance_profile import abrir_pagina
+
 logger = logging.getLogger(__name__)
 
 class LoginPageVivo:
@@ -18,7 +20,7 @@ class LoginPageVivo:
         for attempt in range(retries):
             try:
                 start = time.time()
-                self.driver.get(self.url)
+                abrir_pagina(self.driver, self.url)
                 self.wait.until(EC.presence_of_element_located((By.ID, "login-input")))
                 break
             except (TimeoutException, WebDriverException) as e:
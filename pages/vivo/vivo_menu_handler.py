@@ -6,7 +6,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
 from utils.vivo_file_utils import wait_for_download_file, move_file
-from processors.invoice_processor import FaturaService
+from processors.ingestion_queue import ingerir_fatura
+from utils.driver.cdp_download_manager import marcar_download
 
 logger = logging.getLogger(__name__)
 
@@ -26,13 +27,14 @@ def process_invoice_menu_button(driver, popup_manager, download_dir, target_fold
         boleto_link = next((a for a in links if "Boleto (.pdf)" in a.text), None)
 
         if boleto_link:
+            marker = marcar_download(driver)
             driver.execute_script("arguments[0].click();", boleto_link)
-            pdf_name = wait_for_download_file(download_dir, before_files, extension=".pdf")
+            pdf_name = wait_for_download_file(download_dir, before_files, extension=".pdf", marker=marker)
             if pdf_name:
                 pdf_path = os.path.join(download_dir, pdf_name)
                 final_path = move_file(pdf_path, target_folder, f"vivo_{pdf_name}", overwrite=False)
                 if final_path:
-                    FaturaService(target_folder).processar_fatura_pdf(final_path)
+                    ingerir_fatura(final_path)
 
     except TimeoutException:
         logger.info("Menu suspenso não encontrado, nenhuma fatura via menu disponível.")
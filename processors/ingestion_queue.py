@@ -0,0 +1,131 @@
+# processors/ingestion_queue.py
+import os
+import queue
+import logging
+import threading
+from typing import Optional
+
+from processors.invoice_processor import obter_fatura_service
+
+logger = logging.getLogger(__name__)
+
+
+class FilaIngestaoFaturas:
+    def __init__(self, workers: int = 2, capacidade: int = 20):
+        # Fila limitada: quando cheia, o scraper espera em enviar() em vez de acumular PDFs sem limite.
+        self.fila = queue.Queue(maxsize=max(1, capacidade))
+        self.total_arquivos = 0
+        self.total_inseridas = 0
+        self.total_existentes = 0
+        self.total_falhas = []
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._trabalhar, name=f"ingestao-faturas-{i + 1}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def enviar(self, caminho_pdf: str):
+        if self.fila.full():
+            logger.debug(f"Fila de ingestão cheia ({self.fila.maxsize}); aguardando para enfileirar '{os.path.basename(caminho_pdf)}'.")
+        self.fila.put(caminho_pdf)
+
+    def _trabalhar(self):
+        servico = obter_fatura_service()
+        try:
+            while True:
+                caminho_pdf = self.fila.get()
+                try:
+                    if caminho_pdf is None:
+                        return
+                    self._acumular(caminho_pdf, servico.processar_fatura_pdf(caminho_pdf))
+                except Exception as e:
+                    logger.error(f"Falha técnica na ingestão de '{os.path.basename(caminho_pdf)}'. Erro: {type(e).__name__}")
+                    self._acumular(caminho_pdf, {"inseridas": 0, "existentes": 0, "falhas": [{
+                        "numero_fatura": None,
+                        "numero_contrato": None,
+                        "cnpj_fornecedor": None,
+                        "erro": f"{type(e).__name__}: {e}"
+                    }]})
+                finally:
+                    self.fila.task_done()
+        finally:
+            servico.encerrar()
+
+    def _acumular(self, caminho_pdf: str, resultado: dict):
+        with self._lock:
+            self.total_arquivos += 1
+            self.total_inseridas += resultado["inseridas"]
+            self.total_existentes += resultado["existentes"]
+            self.total_falhas.extend(resultado["falhas"])
+
+    def drenar(self) -> dict:
+        # Processa o que ainda está na fila e encerra os workers.
+        for _ in self._threads:
+            self.fila.put(None)
+        for thread in self._threads:
+            thread.join()
+
+        resumo = {
+            "arquivos": self.total_arquivos,
+            "inseridas": self.total_inseridas,
+            "existentes": self.total_existentes,
+            "falhas": self.total_falhas,
+        }
+        logger.info(
+            f"Ingestão concluída: {resumo['arquivos']} PDF(s), {resumo['inseridas']} fatura(s) inserida(s), "
+            f"{resumo['existentes']} já existiam, {len(resumo['falhas'])} falharam."
+        )
+        for f in resumo["falhas"]:
+            logger.warning(
+                f"   - Fatura: numero_fatura={f.get('numero_fatura', 'N/A')}, "
+                f"numero_contrato={f.get('numero_contrato', 'N/A')}, "
+                f"CNPJ={f.get('cnpj_fornecedor', 'N/A')}, erro={f['erro']}"
+            )
+        return resumo
+
+
+_fila_ingestao = None
+_fila_lock = threading.Lock()
+
+
+def obter_fila_ingestao() -> Optional[FilaIngestaoFaturas]:
+    global _fila_ingestao
+    if os.getenv("INGESTAO_ASSINCRONA", "false").lower() not in ("1", "true", "sim"):
+        return None
+
+    with _fila_lock:
+        if _fila_ingestao is None:
+            _fila_ingestao = FilaIngestaoFaturas(
+                workers=int(os.getenv("INGESTAO_WORKERS", "2")),
+                capacidade=int(os.getenv("INGESTAO_CAPACIDADE", "20")),
+            )
+        return _fila_ingestao
+
+
+def ingerir_fatura(caminho_pdf: str):
+    fila = obter_fila_ingestao()
+    if fila is None:
+        obter_fatura_service().processar_fatura_pdf(caminho_pdf)
+    else:
+        fila.enviar(caminho_pdf)
+
+
+def drenar_fila_ingestao() -> Optional[dict]:
+    global _fila_ingestao
+    with _fila_lock:
+        fila, _fila_ingestao = _fila_ingestao, None
+    return fila.drenar() if fila is not None else None
+
+
+def somar_resumos_ingestao(*resumos) -> Optional[dict]:
+    resumos = [r for r in resumos if r]
+    if not resumos:
+        return None
+    return {
+        "arquivos": sum(r["arquivos"] for r in resumos),
+        "inseridas": sum(r["inseridas"] for r in resumos),
+        "existentes": sum(r["existentes"] for r in resumos),
+        "falhas": [f for r in resumos for f in r["falhas"]],
+    }
@@ -0,0 +1,139 @@
+# processors/invoice_batch_writer.py
+import uuid
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.invoice_model import Fatura, CHAVE_FATURA, indice_chave_fatura_existe
+from processors.invoice_key_index import IndiceChavesFaturas
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_FATURA = (
+    "operadora", "numero_contrato", "nome_fornecedor", "valor_total", "valores_multa", "valores_juros",
+    "valores_retencoes", "forma_pagamento", "numero_cnpj", "numero_nf", "numero_serie", "data_emissao",
+    "valor_nf", "base_calculo_icms", "valor_aliquota", "valor_icms", "data_vencimento", "data_contabil",
+    "numero_fatura",
+)
+
+
+def montar_linha_fatura(dados: dict) -> dict:
+    linha = {coluna: dados.get(coluna) for coluna in COLUNAS_FATURA}
+    linha["id"] = uuid.uuid4()
+    linha["created_at"] = datetime.now(timezone.utc)
+    return linha
+
+
+def chave_fatura(dados: dict) -> tuple:
+    return tuple(dados.get(coluna) for coluna in CHAVE_FATURA)
+
+
+def _insert_do_dialeto(nome_dialeto: str):
+    if nome_dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if nome_dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+_indice_unico = None
+_indice_unico_lock = threading.Lock()
+
+
+def indice_unico_disponivel(bind) -> bool:
+    # Verificado uma vez por processo: sem o índice único, o ON CONFLICT falharia em todo lote.
+    global _indice_unico
+    with _indice_unico_lock:
+        if _indice_unico is None:
+            try:
+                _indice_unico = indice_chave_fatura_existe(bind)
+            except SQLAlchemyError as e:
+                logger.warning(f"Não foi possível verificar o índice único de faturas. Erro: {type(e).__name__}")
+                _indice_unico = False
+            if not _indice_unico:
+                logger.warning("Índice único de faturas ausente; a gravação seguirá fatura a fatura.")
+        return _indice_unico
+
+
+class GravadorFaturasLote:
+    def __init__(self, session, salvar_individual: Callable[[dict], str], tamanho_lote: int = 200,
+                 indice: Optional[IndiceChavesFaturas] = None):
+        self.session = session
+        self.salvar_individual = salvar_individual
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.indice = indice
+        self._pendentes = []
+
+    def adicionar(self, dados: dict) -> list:
+        # Retorna os pares (dados, resultado) do lote descarregado, ou lista vazia enquanto o lote enche.
+        self._pendentes.append(dados)
+        if len(self._pendentes) >= self.tamanho_lote:
+            return self.descarregar()
+        return []
+
+    def descarregar(self) -> list:
+        pendentes, self._pendentes = self._pendentes, []
+        if not pendentes:
+            return []
+
+        resultados = {}
+        if self.indice is not None:
+            for operadora in {dados.get("operadora") for dados in pendentes}:
+                self.indice.carregar(self.session, operadora)
+            resultados.update((id(dados), "existente") for dados in pendentes if self.indice.contem(chave_fatura(dados)))
+
+        # Faturas com algum campo da chave nulo seguem pelo caminho individual (SELECT + INSERT),
+        # que as deduplica mesmo onde o índice único trata nulos como distintos.
+        em_lote = [dados for dados in pendentes if id(dados) not in resultados and None not in chave_fatura(dados)]
+
+        if em_lote and indice_unico_disponivel(self.session.get_bind()):
+            try:
+                resultados.update(zip(map(id, em_lote), self._inserir_lote(em_lote)))
+            except SQLAlchemyError as e:
+                self.session.rollback()
+                logger.warning(
+                    f"Falha na gravação em lote de {len(em_lote)} fatura(s); "
+                    f"gravando individualmente. Erro: {type(e).__name__}"
+                )
+
+        gravacoes = [
+            (dados, resultados[id(dados)] if id(dados) in resultados else self.salvar_individual(dados))
+            for dados in pendentes
+        ]
+
+        if self.indice is not None:
+            for dados, resultado in gravacoes:
+                if resultado in ("ok", "existente"):
+                    self.indice.adicionar(chave_fatura(dados))
+        return gravacoes
+
+    def _inserir_lote(self, lote: list) -> list:
+        insert = _insert_do_dialeto(self.session.get_bind().dialect.name)
+        if insert is None:
+            raise SQLAlchemyError("Dialeto sem suporte a INSERT ... ON CONFLICT.")
+
+        colunas_chave = [getattr(Fatura, coluna) for coluna in CHAVE_FATURA]
+        comando = (
+            insert(Fatura)
+            .values([montar_linha_fatura(dados) for dados in lote])
+            .on_conflict_do_nothing(index_elements=colunas_chave)
+            .returning(*colunas_chave)
+        )
+        inseridas = Counter(tuple(linha) for linha in self.session.execute(comando))
+        self.session.commit()
+
+        # Repetições da mesma chave dentro do lote: só a primeira é inserida, as demais contam como existentes.
+        resultados = []
+        for dados in lote:
+            chave = chave_fatura(dados)
+            if inseridas[chave] > 0:
+                inseridas[chave] -= 1
+                resultados.append("ok")
+            else:
+                resultados.append("existente")
+        return resultados
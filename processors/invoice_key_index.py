@@ -0,0 +1,77 @@
+# processors/invoice_key_index.py
+import os
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.invoice_model import Fatura, CHAVE_FATURA
+
+logger = logging.getLogger(__name__)
+
+
+class IndiceChavesFaturas:
+    def __init__(self, dias: Optional[int] = None):
+        # Só contém chaves confirmadas no banco: ausência não prova que a fatura é nova, presença prova que já existe.
+        self.dias = dias
+        self.rejeitadas = 0
+        self._chaves = set()
+        self._operadoras_carregadas = set()
+        self._lock = threading.Lock()
+        self._carga_lock = threading.Lock()
+
+    def carregar(self, session, operadora: Optional[str]):
+        # Cargas serializadas: a operadora só conta como carregada depois que a consulta deu certo,
+        # então uma falha é tentada de novo no próximo lote.
+        with self._carga_lock:
+            with self._lock:
+                if operadora in self._operadoras_carregadas:
+                    return
+
+            colunas = [getattr(Fatura, coluna) for coluna in CHAVE_FATURA]
+            consulta = session.query(*colunas).filter(Fatura.operadora == operadora)
+            if self.dias:
+                consulta = consulta.filter(Fatura.created_at >= datetime.now(timezone.utc) - timedelta(days=self.dias))
+
+            try:
+                chaves = {tuple(linha) for linha in consulta.yield_per(5000)}
+            except SQLAlchemyError as e:
+                session.rollback()
+                logger.warning(f"Falha ao pré-carregar chaves de faturas da {operadora}. Erro: {type(e).__name__}")
+                return
+
+            with self._lock:
+                self._chaves.update(chaves)
+                self._operadoras_carregadas.add(operadora)
+        periodo = f"últimos {self.dias} dias" if self.dias else "todo o histórico"
+        logger.info(f"Índice de faturas: {len(chaves)} chave(s) da {operadora} carregadas ({periodo}).")
+
+    def contem(self, chave: tuple) -> bool:
+        with self._lock:
+            if chave in self._chaves:
+                self.rejeitadas += 1
+                return True
+            return False
+
+    def adicionar(self, chave: tuple):
+        with self._lock:
+            self._chaves.add(chave)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {"chaves": len(self._chaves), "rejeitadas": self.rejeitadas}
+
+
+_indice_chaves = None
+
+
+def obter_indice_chaves() -> Optional[IndiceChavesFaturas]:
+    global _indice_chaves
+    if os.getenv("INDICE_CHAVES_HABILITADO", "false").lower() not in ("1", "true", "sim"):
+        return None
+
+    if _indice_chaves is None:
+        dias = int(os.getenv("INDICE_CHAVES_DIAS", "365"))
+        _indice_chaves = IndiceChavesFaturas(dias if dias > 0 else None)
+    return _indice_chaves
@@ -1,25 +1,44 @@
 import os
-import uuid
-import pdfplumber
 import logging
-from datetime import datetime, timezone
-from sqlalchemy.orm import sessionmaker
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from sqlalchemy.exc import SQLAlchemyError
 
-from config.database_engine import engine, Session
+from config.database_engine import Session, obter_metricas_pool
 from models.invoice_model import Fatura
+from processors.invoice_batch_writer import GravadorFaturasLote, montar_linha_fatura
+from processors.invoice_key_index import obter_indice_chaves
+from models import invoice_model
+from extractors import field_engine, pdf_document
+from extractors.pdf_document import DocumentoPdf
+from extractors.extraction_cache import obter_cache_extracao, versao_codigo
+from extractors.claro import claro_invoice_extractor
 from extractors.claro.claro_invoice_extractor import extrair_claro
+from extractors.vivo import vivo_invoice_extractor
 from extractors.vivo.vivo_invoice_extractor import extrair_vivo
 
 logger = logging.getLogger(__name__)
-Session = sessionmaker(bind=engine)
+
+VERSAO_EXTRACAO = versao_codigo(
+    claro_invoice_extractor, vivo_invoice_extractor, field_engine, pdf_document, invoice_model
+)
 
 class FaturaService:
-    def __init__(self, pasta_faturas: str):
+    def __init__(self, pasta_faturas: Optional[str] = None):
         self.pasta_faturas = pasta_faturas
-        self.session = Session()
+        self.tamanho_lote = int(os.getenv("FATURAS_LOTE_TAMANHO", "200"))
+
+    @property
+    def session(self):
+        # Sessão da thread atual (scoped_session), para que o serviço possa ser compartilhado.
+        return Session()
+
+    def encerrar(self):
+        Session.remove()
 
-    def identificar_operadora(self, texto: str) -> str:
+    @staticmethod
+    def identificar_operadora(texto: str) -> str:
         texto_lower = texto.lower()
         if "telefônica" in texto_lower or "vivo" in texto_lower:
             return "VIVO"
@@ -27,26 +46,14 @@ class FaturaService:
             return "CLARO"
         return "DESCONHECIDA"
 
-    def extrair_operadora(self, operadora: str, caminho_pdf: str):
+    @staticmethod
+    def extrair_operadora(operadora: str, documento: DocumentoPdf, incremental: bool = False):
         if operadora == "CLARO":
-            return extrair_claro(caminho_pdf)
+            return extrair_claro(documento, incremental)
         if operadora == "VIVO":
-            return [extrair_vivo(caminho_pdf)]
+            return [extrair_vivo(documento, incremental)]
         return []
 
-    def ler_texto_pdf(self, caminho_pdf: str) -> str:
-        try:
-            texto_pdf = ""
-            with pdfplumber.open(caminho_pdf) as pdf:
-                for pagina in pdf.pages:
-                    t = pagina.extract_text()
-                    if t:
-                        texto_pdf += t + "\n"
-            return texto_pdf
-        except Exception as e:
-            logger.error(f"Falha técnica ao ler PDF '{os.path.basename(caminho_pdf)}'. Erro: {type(e).__name__}")
-            return ""
-
     def salvar_fatura(self, dados: dict) -> str:
         try:
             existente = self.session.query(Fatura).filter_by(
@@ -58,29 +65,7 @@ class FaturaService:
             if existente:
                 return "existente"
 
-            nova_fatura = Fatura(
-                id=uuid.uuid4(),
-                operadora=dados.get("operadora"),
-                numero_contrato=dados.get("numero_contrato"),
-                nome_fornecedor=dados.get("nome_fornecedor"),
-                valor_total=dados.get("valor_total"),
-                valores_multa=dados.get("valores_multa"),
-                valores_juros=dados.get("valores_juros"),
-                valores_retencoes=dados.get("valores_retencoes"),
-                forma_pagamento=dados.get("forma_pagamento"),
-                numero_cnpj=dados.get("numero_cnpj"),
-                numero_nf=dados.get("numero_nf"),
-                numero_serie=dados.get("numero_serie"),
-                data_emissao=dados.get("data_emissao"),
-                valor_nf=dados.get("valor_nf"),
-                base_calculo_icms=dados.get("base_calculo_icms"),
-                valor_aliquota=dados.get("valor_aliquota"),
-                valor_icms=dados.get("valor_icms"),
-                data_vencimento=dados.get("data_vencimento"),
-                data_contabil=dados.get("data_contabil"),
-                numero_fatura=dados.get("numero_fatura"),
-                created_at=datetime.now(timezone.utc)
-            )
+            nova_fatura = Fatura(**montar_linha_fatura(dados))
 
             self.session.add(nova_fatura)
             self.session.commit()
@@ -95,71 +80,177 @@ class FaturaService:
             logger.error(f"Falha técnica inesperada ao salvar fatura. Erro: {type(e).__name__}")
             return f"erro: {str(e)}"
 
+    def criar_gravador_lote(self) -> GravadorFaturasLote:
+        return GravadorFaturasLote(self.session, self.salvar_fatura, self.tamanho_lote, obter_indice_chaves())
+
+    def salvar_faturas(self, lista_dados: list) -> list:
+        gravador = self.criar_gravador_lote()
+        resultados = []
+        for dados in lista_dados:
+            resultados.extend(gravador.adicionar(dados))
+        resultados.extend(gravador.descarregar())
+        return [resultado for _, resultado in resultados]
+
     def processar_fatura_pdf(self, caminho_pdf: str) -> dict:
-        falhas = []
-        inseridas = 0
-        existentes = 0
+        return self._concluir_extracao(caminho_pdf, _extrair_faturas_pdf(caminho_pdf))
 
-        try:
-            texto_pdf = self.ler_texto_pdf(caminho_pdf)
-            if not texto_pdf:
-                logger.warning(f"Falha técnica: texto não pôde ser extraído de '{os.path.basename(caminho_pdf)}'.")
-                return {"inseridas": 0, "existentes": 0, "falhas": []}
-
-            operadora = self.identificar_operadora(texto_pdf)
-            lista_faturas = self.extrair_operadora(operadora, caminho_pdf)
-
-            if not lista_faturas:
-                logger.warning(f"Nenhuma fatura extraída de '{os.path.basename(caminho_pdf)}'.")
-                return {"inseridas": 0, "existentes": 0, "falhas": []}
-
-            for dados in lista_faturas:
-                resultado = self.salvar_fatura(dados)
-                if resultado == "ok":
-                    inseridas += 1
-                elif resultado == "existente":
-                    existentes += 1
-                else:
-                    falhas.append({
-                        "numero_fatura": dados.get("numero_fatura"),
-                        "numero_contrato": dados.get("numero_contrato"),
-                        "cnpj_fornecedor": dados.get("numero_cnpj"),
-                        "erro": resultado
-                    })
+    def _concluir_extracao(self, caminho_pdf: str, extracao: dict, contabilizar_cache: bool = False) -> dict:
+        self._atualizar_cache(extracao, contabilizar_cache)
+        resultado = self.registrar_extracao(caminho_pdf, extracao["faturas"], extracao["erro"])
+        resultado["pico_memoria_mb"] = extracao["pico_memoria_mb"]
+        return resultado
 
-        except Exception as e:
-            logger.error(f"Falha técnica ao processar PDF '{os.path.basename(caminho_pdf)}'. Erro: {type(e).__name__}")
-            falhas.append({
+    @staticmethod
+    def _atualizar_cache(extracao: dict, contabilizar_cache: bool):
+        cache = obter_cache_extracao()
+        if cache is not None and extracao["chave_cache"] is not None:
+            if contabilizar_cache:
+                cache.registrar_consulta(extracao["do_cache"])
+            if not extracao["do_cache"] and extracao["faturas"] is not None:
+                cache.salvar(extracao["chave_cache"], extracao["faturas"])
+
+    def registrar_extracao(self, caminho_pdf: str, lista_faturas: Optional[list], erro: Optional[tuple] = None) -> dict:
+        resultado = self._validar_extracao(caminho_pdf, lista_faturas, erro)
+        if resultado is not None:
+            return resultado
+        return self._contabilizar_gravacoes(zip(lista_faturas, self.salvar_faturas(lista_faturas)))
+
+    @staticmethod
+    def _validar_extracao(caminho_pdf: str, lista_faturas: Optional[list], erro: Optional[tuple]) -> Optional[dict]:
+        if erro:
+            tipo_erro, mensagem_erro = erro
+            logger.error(f"Falha técnica ao processar PDF '{os.path.basename(caminho_pdf)}'. Erro: {tipo_erro}")
+            falhas = [{
                 "numero_fatura": None,
                 "numero_contrato": None,
                 "cnpj_fornecedor": None,
-                "erro": str(e)
-            })
-        
+                "erro": mensagem_erro
+            }]
+            return {"inseridas": 0, "existentes": 0, "falhas": falhas}
+
+        if lista_faturas is None:
+            logger.warning(f"Falha técnica: texto não pôde ser extraído de '{os.path.basename(caminho_pdf)}'.")
+            return {"inseridas": 0, "existentes": 0, "falhas": []}
+
+        if not lista_faturas:
+            logger.warning(f"Nenhuma fatura extraída de '{os.path.basename(caminho_pdf)}'.")
+            return {"inseridas": 0, "existentes": 0, "falhas": []}
+
+        return None
+
+    @staticmethod
+    def _contabilizar_gravacoes(gravacoes) -> dict:
+        falhas = []
+        inseridas = 0
+        existentes = 0
+
+        for dados, resultado in gravacoes:
+            if resultado == "ok":
+                inseridas += 1
+            elif resultado == "existente":
+                existentes += 1
+            else:
+                falhas.append({
+                    "numero_fatura": dados.get("numero_fatura"),
+                    "numero_contrato": dados.get("numero_contrato"),
+                    "cnpj_fornecedor": dados.get("numero_cnpj"),
+                    "erro": resultado
+                })
+
         return {"inseridas": inseridas, "existentes": existentes, "falhas": falhas}
 
-    def processar_todas_faturas_na_pasta(self):
+    def processar_todas_faturas_na_pasta(self, workers: Optional[int] = None, chunksize: Optional[int] = None):
         arquivos_pdf = [f for f in os.listdir(self.pasta_faturas) if f.lower().endswith('.pdf')]
 
         if not arquivos_pdf:
             logger.info("Nenhum arquivo PDF encontrado na pasta.")
             return
 
+        if workers is None:
+            workers = int(os.getenv("FATURAS_WORKERS", "1"))
+        if chunksize is None:
+            chunksize = int(os.getenv("FATURAS_CHUNKSIZE", "4"))
+
+        caminhos_pdf = [os.path.join(self.pasta_faturas, arquivo) for arquivo in arquivos_pdf]
+
+        if workers > 1:
+            logger.info(
+                f"Iniciando processamento de {len(arquivos_pdf)} arquivo(s) PDF "
+                f"em paralelo ({workers} processos, lotes de {chunksize})..."
+            )
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                extracoes = executor.map(_extrair_faturas_pdf, caminhos_pdf, chunksize=max(1, chunksize))
+                totais = self._registrar_extracoes(caminhos_pdf, extracoes, contabilizar_cache=True)
+        else:
+            logger.info(f"Iniciando processamento de {len(arquivos_pdf)} arquivo(s) PDF...")
+            extracoes = (_extrair_faturas_pdf(caminho_pdf) for caminho_pdf in caminhos_pdf)
+            totais = self._registrar_extracoes(caminhos_pdf, extracoes)
+
+        total_inseridas, total_existentes, total_falhas, picos_memoria = totais
+        self._registrar_resumo(total_inseridas, total_existentes, total_falhas)
+        self._registrar_resumo_memoria(picos_memoria)
+
+        cache = obter_cache_extracao()
+        if cache is not None:
+            estatisticas = cache.estatisticas()
+            logger.info(
+                f"Cache de extração: {estatisticas['acertos']} acerto(s), {estatisticas['falhas']} consulta(s) sem entrada."
+            )
+
+        indice = obter_indice_chaves()
+        if indice is not None:
+            estatisticas = indice.estatisticas()
+            logger.info(
+                f"Índice de faturas: {estatisticas['rejeitadas']} duplicata(s) descartada(s) sem consulta ao banco, "
+                f"{estatisticas['chaves']} chave(s) em memória."
+            )
+
+    def _registrar_extracoes(self, caminhos_pdf: list, extracoes, contabilizar_cache: bool = False) -> tuple:
+        # As faturas de vários PDFs são acumuladas e gravadas em lotes de FATURAS_LOTE_TAMANHO.
+        gravador = self.criar_gravador_lote()
         total_inseridas = 0
         total_existentes = 0
         total_falhas = []
+        picos_memoria = {}
 
-        logger.info(f"Iniciando processamento de {len(arquivos_pdf)} arquivo(s) PDF...")
-
-        for arquivo in arquivos_pdf:
-            caminho_completo = os.path.join(self.pasta_faturas, arquivo)
-            resultado = self.processar_fatura_pdf(caminho_completo)
-
+        def acumular(resultado: dict):
+            nonlocal total_inseridas, total_existentes
             total_inseridas += resultado["inseridas"]
             total_existentes += resultado["existentes"]
-            if resultado["falhas"]:
-                total_falhas.extend(resultado["falhas"])
+            total_falhas.extend(resultado["falhas"])
+
+        for caminho_pdf, extracao in zip(caminhos_pdf, extracoes):
+            self._atualizar_cache(extracao, contabilizar_cache)
+            if extracao["pico_memoria_mb"] is not None:
+                picos_memoria[os.path.basename(caminho_pdf)] = extracao["pico_memoria_mb"]
+
+            resultado = self._validar_extracao(caminho_pdf, extracao["faturas"], extracao["erro"])
+            if resultado is not None:
+                acumular(resultado)
+                continue
+
+            gravacoes = []
+            for dados in extracao["faturas"]:
+                gravacoes.extend(gravador.adicionar(dados))
+            acumular(self._contabilizar_gravacoes(gravacoes))
 
+        acumular(self._contabilizar_gravacoes(gravador.descarregar()))
+        return total_inseridas, total_existentes, total_falhas, picos_memoria
+
+    def _registrar_resumo_memoria(self, picos_memoria: dict, limite_listagem: int = 10):
+        if not picos_memoria:
+            return
+
+        ordenados = sorted(picos_memoria.items(), key=lambda item: item[1], reverse=True)
+        mensagem = f"Pico de memória (RSS) por PDF: máximo de {ordenados[0][1]:.0f} MB.\n"
+        for arquivo, pico in ordenados[:limite_listagem]:
+            mensagem += f"   - {arquivo}: {pico:.0f} MB\n"
+        logger.info(mensagem)
+
+        for arquivo, pico in ordenados[limite_listagem:]:
+            logger.debug(f"Pico de memória de '{arquivo}': {pico:.0f} MB")
+
+    def _registrar_resumo(self, total_inseridas: int, total_existentes: int, total_falhas: list):
         if not total_falhas:
             logger.info("Todas as faturas foram processadas com sucesso.")
         else:
@@ -174,3 +265,78 @@ class FaturaService:
                     f"CNPJ={f.get('cnpj_fornecedor', 'N/A')}, erro={f['erro']}\n"
                 )
             logger.warning(mensagem)
+
+
+_fatura_service = None
+_fatura_service_lock = threading.Lock()
+
+
+def obter_fatura_service() -> FaturaService:
+    # Chamado também pelas threads da fila de ingestão: uma única instância por processo.
+    global _fatura_service
+    if _fatura_service is None:
+        with _fatura_service_lock:
+            if _fatura_service is None:
+                _fatura_service = FaturaService()
+    return _fatura_service
+
+
+def encerrar_fatura_service():
+    if _fatura_service is None:
+        return
+    _fatura_service.encerrar()
+    metricas = obter_metricas_pool()
+    logger.info(
+        f"Pool de conexões: {metricas['checkouts']} checkout(s), {metricas['conexoes_criadas']} conexão(ões) aberta(s), "
+        f"espera média de {metricas['espera_media_ms']:.1f} ms (máxima {metricas['espera_maxima_ms']:.1f} ms). "
+        f"{metricas['status']}"
+    )
+
+
+def _extracao_incremental() -> bool:
+    return os.getenv("EXTRACAO_INCREMENTAL", "false").lower() in ("1", "true", "sim")
+
+
+def _extrair_faturas_pdf(caminho_pdf: str) -> dict:
+    # Executada tanto no processo principal quanto nos processos do pool: não grava no banco.
+    cache = obter_cache_extracao()
+    incremental = _extracao_incremental()
+    extracao = {"faturas": None, "erro": None, "chave_cache": None, "do_cache": False, "pico_memoria_mb": None}
+    documento = None
+
+    try:
+        try:
+            documento = DocumentoPdf.carregar(caminho_pdf)
+            if cache is not None:
+                versao = f"{VERSAO_EXTRACAO}:incremental" if incremental else VERSAO_EXTRACAO
+                extracao["chave_cache"] = cache.gerar_chave(documento.conteudo, versao)
+                lista_faturas = cache.obter(extracao["chave_cache"])
+                if lista_faturas is not None:
+                    extracao.update(faturas=lista_faturas, do_cache=True)
+                    return extracao
+
+            # A operadora é identificada pela primeira página; o texto completo só é lido se ela não bastar.
+            texto = documento.pagina(0) or ""
+            operadora = FaturaService.identificar_operadora(texto)
+            if operadora == "DESCONHECIDA":
+                texto = documento.texto
+                operadora = FaturaService.identificar_operadora(texto)
+        except MemoryError as e:
+            extracao["erro"] = (type(e).__name__, str(e))
+            return extracao
+        except Exception as e:
+            logger.error(f"Falha técnica ao ler PDF '{os.path.basename(caminho_pdf)}'. Erro: {type(e).__name__}")
+            return extracao
+
+        if not texto:
+            return extracao
+
+        try:
+            extracao["faturas"] = FaturaService.extrair_operadora(operadora, documento, incremental)
+        except Exception as e:
+            extracao["erro"] = (type(e).__name__, str(e))
+        return extracao
+    finally:
+        if documento is not None:
+            documento.fechar()
+            extracao["pico_memoria_mb"] = documento.pico_memoria_mb
@@ -8,10 +8,13 @@ from pages.claro.claro_home_page import HomePage
 from pages.vivo.customer_selector_page_vivo import CustomerSelectorPage
 from services.vivo_invoice_download_service import download_all_paginated_invoices
 from utils.session_manager_vivo import ensure_logged_in
+from utils.driver.driver_pool import driver_saudavel
 from utils.json_failure_logger import JsonFailureLogger
 
 
-def process_customers(driver, popup_manager, login_page, usuario, senha, pasta_download_base, skip_existing=True):
+def process_customers(driver, popup_manager, login_page, usuario, senha, pasta_download_base, skip_existing=True,
+                      replace_driver_fn=None):
+    # replace_driver_fn() -> (driver, popup_manager, login_page): swaps a browser that stopped responding.
     customer_selector = CustomerSelectorPage(driver)
     customer_selector.open_menu()
     cnpjs = customer_selector.get_cnpjs()
@@ -24,99 +27,117 @@ def process_customers(driver, popup_manager, login_page, usuario, senha, pasta_d
     json_logger = JsonFailureLogger()
 
     for cnpj_atual in cnpjs:
-        logging.info(f"--- Processando CNPJ: {cnpj_atual} ---\n")
-        tentativas = 0
-        sucesso = False
-        ultimo_erro = None
+        sucesso, tentativas, ultimo_erro = process_customer(
+            driver, popup_manager, login_page, customer_selector, usuario, senha,
+            cnpj_atual, pasta_download_base, pasta_download_base, skip_existing
+        )
+        if not sucesso:
+            _register_customer_failure(json_logger, cnpj_atual, tentativas, ultimo_erro)
+            if replace_driver_fn and not driver_saudavel(driver):
+                logging.warning("Navegador não responde; substituindo.")
+                driver, popup_manager, login_page = replace_driver_fn()
+                customer_selector = CustomerSelectorPage(driver)
+                customer_selector.open_menu()
 
-        while tentativas < 3 and not sucesso:
-            try:
-                popup_manager.handle_all()
 
-                if ensure_logged_in(driver, login_page, usuario, senha):
-                    customer_selector.open_menu()
-                    continue
+def process_customer(driver, popup_manager, login_page, customer_selector, usuario, senha,
+                     cnpj_atual, download_dir, base_folder, skip_existing=True):
+    logging.info(f"--- Processando CNPJ: {cnpj_atual} ---\n")
+    tentativas = 0
+    sucesso = False
+    ultimo_erro = None
 
-                if not customer_selector.click_by_text(cnpj_atual):
-                    tentativas += 1
-                    ultimo_erro = f"Não foi possível selecionar {cnpj_atual}. Tentativa {tentativas}"
-                    logging.warning(ultimo_erro)
+    while tentativas < 3 and not sucesso:
+        try:
+            popup_manager.handle_all()
 
-                    time.sleep(2)
-                    try:
-                        customer_selector.open_menu()
-                    except TimeoutException:
-                        logging.warning("Timeout ao tentar reabrir a lista de CNPJs.")
-                    continue
-
-                home_page = HomePage(driver)
-                popup_manager.handle_all()
+            if ensure_logged_in(driver, login_page, usuario, senha):
+                customer_selector.open_menu()
+                continue
 
-                if not home_page.verificar_opcao_acessar_faturas():
-                    ultimo_erro = f"{cnpj_atual} não possui opção 'Acessar faturas'. Avançando..."
-                    logging.info(ultimo_erro)
+            if not customer_selector.click_by_text(cnpj_atual):
+                tentativas += 1
+                ultimo_erro = f"Não foi possível selecionar {cnpj_atual}. Tentativa {tentativas}"
+                logging.warning(ultimo_erro)
 
-                    driver.back()
-                    time.sleep(2)
+                time.sleep(2)
+                try:
                     customer_selector.open_menu()
-                    tentativas += 1
-                    continue
+                except TimeoutException:
+                    logging.warning("Timeout ao tentar reabrir a lista de CNPJs.")
+                continue
 
-                popup_manager.handle_all()
-                home_page.acessar_faturas()
-                time.sleep(2)
+            home_page = HomePage(driver)
+            popup_manager.handle_all()
 
-                download_all_paginated_invoices(
-                    driver=driver,
-                    popup_manager=popup_manager,
-                    download_dir=pasta_download_base,
-                    base_folder=pasta_download_base,
-                    cnpj=cnpj_atual,
-                    login_page=login_page,
-                    usuario=usuario,
-                    senha=senha,
-                    skip_existing=skip_existing
-                )
+            if not home_page.verificar_opcao_acessar_faturas():
+                ultimo_erro = f"{cnpj_atual} não possui opção 'Acessar faturas'. Avançando..."
+                logging.info(ultimo_erro)
 
-                time.sleep(2)
                 driver.back()
                 time.sleep(2)
                 customer_selector.open_menu()
-                sucesso = True
-
-            except Exception as e:
-                import traceback
-                if isinstance(e, TimeoutException):
-                    erro_msg = "Tempo limite ao aguardar a página ou elemento."
-                    logging.error(f"Erro processando {cnpj_atual}: {erro_msg}")
-                elif isinstance(e, NoSuchElementException):
-                    erro_msg = "Elemento esperado não foi encontrado na página."
-                    logging.error(f"Erro processando {cnpj_atual}: {erro_msg}")
-                elif isinstance(e, WebDriverException):
-                    erro_msg = "Problema de comunicação com o navegador."
-                    logging.error(f"Erro processando {cnpj_atual}: {erro_msg}")
-                else:
-                    erro_msg = "Erro inesperado."
-                    logging.error(f"Erro processando {cnpj_atual}: {erro_msg}")
-
-                logging.debug(traceback.format_exc())
-
                 tentativas += 1
-                ultimo_erro = erro_msg
-                time.sleep(3)
-
-        if not sucesso:
-            if not ultimo_erro:
-                ultimo_erro = f"Falha após 3 tentativas no CNPJ {cnpj_atual}. Avançando para o próximo."
+                continue
+
+            popup_manager.handle_all()
+            home_page.acessar_faturas()
+            time.sleep(2)
+
+            download_all_paginated_invoices(
+                driver=driver,
+                popup_manager=popup_manager,
+                download_dir=download_dir,
+                base_folder=base_folder,
+                cnpj=cnpj_atual,
+                login_page=login_page,
+                usuario=usuario,
+                senha=senha,
+                skip_existing=skip_existing
+            )
+
+            time.sleep(2)
+            driver.back()
+            time.sleep(2)
+            customer_selector.open_menu()
+            sucesso = True
+
+        except Exception as e:
+            import traceback
+            if isinstance(e, TimeoutException):
+                erro_msg = "Tempo limite ao aguardar a página ou elemento."
+                logging.error(f"Erro processando {cnpj_atual}: {erro_msg}")
+            elif isinstance(e, NoSuchElementException):
+                erro_msg = "Elemento esperado não foi encontrado na página."
+                logging.error(f"Erro processando {cnpj_atual}: {erro_msg}")
+            elif isinstance(e, WebDriverException):
+                erro_msg = "Problema de comunicação com o navegador."
+                logging.error(f"Erro processando {cnpj_atual}: {erro_msg}")
             else:
-                ultimo_erro = f"Falha após 3 tentativas no CNPJ {cnpj_atual}. Último erro: {ultimo_erro}"
+                erro_msg = "Erro inesperado."
+                logging.error(f"Erro processando {cnpj_atual}: {erro_msg}")
+
+            logging.debug(traceback.format_exc())
+
+            tentativas += 1
+            ultimo_erro = erro_msg
+            time.sleep(3)
+
+    return sucesso, tentativas, ultimo_erro
+
+
+def _register_customer_failure(json_logger, cnpj_atual, tentativas, ultimo_erro):
+    if not ultimo_erro:
+        ultimo_erro = f"Falha após 3 tentativas no CNPJ {cnpj_atual}. Avançando para o próximo."
+    else:
+        ultimo_erro = f"Falha após 3 tentativas no CNPJ {cnpj_atual}. Último erro: {ultimo_erro}"
 
-            logging.warning(ultimo_erro)
+    logging.warning(ultimo_erro)
 
-            dados_falha = {
-                "cnpj": cnpj_atual,
-                "tentativa": tentativas,
-                "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "erro": ultimo_erro
-            }
-            json_logger.registrar_falha_vivo(dados_falha)
+    dados_falha = {
+        "cnpj": cnpj_atual,
+        "tentativa": tentativas,
+        "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "erro": ultimo_erro
+    }
+    json_logger.registrar_falha_vivo(dados_falha)
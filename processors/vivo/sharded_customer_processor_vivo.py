@@ -0,0 +1,215 @@
+# sharded_customer_processor_vivo.py
+import os
+import queue
+import logging
+import multiprocessing
+from collections import deque
+
+from config.database_engine import engine
+from config.logger_config import definir_prefixo_log
+from pages.vivo.customer_selector_page_vivo import CustomerSelectorPage
+from processors.ingestion_queue import drenar_fila_ingestao, somar_resumos_ingestao
+from processors.invoice_processor import encerrar_fatura_service
+from processors.vivo.customer_invoice_processor_vivo import process_customer, _register_customer_failure
+from utils.download_watcher import registrar_metricas_downloads
+from utils.driver.cdp_download_manager import desativar_downloads_cdp
+from utils.http_download_client import encerrar_cliente_http
+from utils.driver.driver_pool import PoolDrivers, driver_saudavel
+from utils.driver.performance_profile import registrar_metricas_carregamento
+from utils.driver.vivo_chrome_driver import create_driver
+from utils.json_failure_logger import JsonFailureLogger
+from utils.session_manager_vivo import login_vivo
+
+
+def _shard_worker(worker_id, tarefas, resultados, usuario, senha, login_url, base_folder, skip_existing):
+    # Processo próprio: driver, login e pasta de download exclusivos; conexões do pai não são reaproveitadas.
+    engine.dispose(close=False)
+    definir_prefixo_log(f"VIVO-{worker_id}")
+    download_dir = os.path.join(base_folder, "vivo_workers", f"worker_{worker_id}")
+    driver = None
+    erro = None
+    # Navegadores reserva pré-iniciados em segundo plano (DRIVER_POOL_TAMANHO); o primeiro pronto é usado já.
+    pool = PoolDrivers(lambda: create_driver(download_dir), int(os.getenv("DRIVER_POOL_TAMANHO", "0")))
+    pool.iniciar()
+
+    try:
+        driver = pool.obter()
+        sessao = login_vivo(driver, login_url, usuario, senha)
+        if sessao is None:
+            erro = "login não confirmado"
+            return
+        login_page, popup_manager = sessao
+
+        customer_selector = CustomerSelectorPage(driver)
+        customer_selector.open_menu()
+        resultados.put(("pronto", worker_id, None))
+
+        while True:
+            cnpj = tarefas.get()
+            if cnpj is None:
+                break
+            sucesso, tentativas, ultimo_erro = process_customer(
+                driver, popup_manager, login_page, customer_selector, usuario, senha,
+                cnpj, download_dir, base_folder, skip_existing
+            )
+            resultados.put(("resultado", worker_id, {
+                "cnpj": cnpj, "sucesso": sucesso, "tentativas": tentativas, "erro": ultimo_erro
+            }))
+            if not sucesso and not driver_saudavel(driver):
+                # Navegador travado ou encerrado: troca pelo próximo do pool em vez de encerrar o worker.
+                logging.warning(f"Navegador do worker {worker_id} não responde; substituindo.")
+                pool.descartar(driver)
+                driver = pool.obter()
+                sessao = login_vivo(driver, login_url, usuario, senha)
+                if sessao is None:
+                    erro = "login não confirmado no navegador substituto"
+                    return
+                login_page, popup_manager = sessao
+                customer_selector = CustomerSelectorPage(driver)
+                customer_selector.open_menu()
+    except Exception as e:
+        logging.exception(f"Worker Vivo {worker_id} interrompido")
+        erro = f"{type(e).__name__}: {e}"
+    finally:
+        if driver:
+            try:
+                registrar_metricas_carregamento(driver)
+                desativar_downloads_cdp(driver)
+                encerrar_cliente_http(driver)
+                driver.quit()
+            except Exception:
+                pass
+        pool.encerrar()
+        ingestao = drenar_fila_ingestao()
+        registrar_metricas_downloads()
+        encerrar_fatura_service()
+        resultados.put(("encerrado", worker_id, {"erro": erro, "ingestao": ingestao}))
+
+
+def process_customers_sharded(cnpjs, usuario, senha, login_url, base_folder, workers, skip_existing=True,
+                              max_workers_per_cnpj=2):
+    contexto = multiprocessing.get_context("fork")
+    resultados = contexto.Queue()
+    filas = {}
+    processos = {}
+    for worker_id in range(1, workers + 1):
+        filas[worker_id] = contexto.Queue()
+        processos[worker_id] = contexto.Process(
+            target=_shard_worker,
+            args=(worker_id, filas[worker_id], resultados, usuario, senha, login_url, base_folder, skip_existing),
+            name=f"vivo-worker-{worker_id}"
+        )
+        processos[worker_id].start()
+    logging.info(f"{len(cnpjs)} CNPJ(s) distribuídos entre {workers} navegador(es) Vivo.")
+
+    # Distribuição sob demanda: cada worker recebe um CNPJ quando fica livre.
+    # Um CNPJ que falha volta para a fila, excluindo os workers onde já falhou.
+    pendentes = deque({"cnpj": cnpj, "excluidos": set(), "tentativas": 0, "erro": None} for cnpj in cnpjs)
+    ativos = set(processos)
+    ociosos = set()
+    em_andamento = {}
+    relatorio = {}
+    resumos_ingestao = []
+    json_logger = JsonFailureLogger()
+
+    def finalizar(item, erro=None):
+        erro = item["erro"] or erro
+        relatorio[item["cnpj"]] = {
+            "cnpj": item["cnpj"], "sucesso": False, "workers": sorted(item["excluidos"]),
+            "tentativas": item["tentativas"], "erro": erro
+        }
+        _register_customer_failure(json_logger, item["cnpj"], item["tentativas"], erro)
+
+    def tratar_falha(worker_id, item, tentativas, erro):
+        item["excluidos"].add(worker_id)
+        item["tentativas"] += tentativas
+        item["erro"] = erro or item["erro"]
+        candidatos = ativos - item["excluidos"]
+        if candidatos and len(item["excluidos"]) < max_workers_per_cnpj:
+            logging.info(f"CNPJ {item['cnpj']} falhou no worker {worker_id}; reenfileirado para outro worker.")
+            pendentes.append(item)
+        else:
+            finalizar(item)
+
+    while pendentes or em_andamento:
+        for worker_id in sorted(ociosos):
+            item = next((i for i in pendentes if worker_id not in i["excluidos"]), None)
+            if item is not None:
+                pendentes.remove(item)
+                ociosos.discard(worker_id)
+                em_andamento[worker_id] = item
+                filas[worker_id].put(item["cnpj"])
+
+        # CNPJs que nenhum worker restante pode assumir.
+        for item in [i for i in pendentes if not ativos - i["excluidos"]]:
+            pendentes.remove(item)
+            finalizar(item, "nenhum worker disponível para nova tentativa")
+
+        if not ativos:
+            for item in list(pendentes):
+                finalizar(item, "nenhum worker Vivo ativo")
+            pendentes.clear()
+            break
+
+        try:
+            tipo, worker_id, dados = resultados.get(timeout=5)
+        except queue.Empty:
+            for worker_id in [w for w in ativos if not processos[w].is_alive()]:
+                logging.error(f"Worker Vivo {worker_id} terminou inesperadamente.")
+                ativos.discard(worker_id)
+                ociosos.discard(worker_id)
+                if worker_id in em_andamento:
+                    tratar_falha(worker_id, em_andamento.pop(worker_id), 0, "worker encerrado inesperadamente")
+            continue
+
+        if tipo == "pronto":
+            ociosos.add(worker_id)
+        elif tipo == "resultado":
+            item = em_andamento.pop(worker_id)
+            ociosos.add(worker_id)
+            if dados["sucesso"]:
+                relatorio[item["cnpj"]] = {
+                    "cnpj": item["cnpj"], "sucesso": True, "workers": sorted(item["excluidos"] | {worker_id}),
+                    "tentativas": item["tentativas"] + dados["tentativas"], "erro": None
+                }
+            else:
+                tratar_falha(worker_id, item, dados["tentativas"], dados["erro"])
+        elif tipo == "encerrado":
+            if dados["erro"]:
+                logging.error(f"Worker Vivo {worker_id} encerrado: {dados['erro']}")
+            resumos_ingestao.append(dados["ingestao"])
+            ativos.discard(worker_id)
+            ociosos.discard(worker_id)
+            if worker_id in em_andamento:
+                tratar_falha(worker_id, em_andamento.pop(worker_id), 0, dados["erro"])
+
+    for worker_id in ativos:
+        filas[worker_id].put(None)
+    while ativos:
+        try:
+            tipo, worker_id, dados = resultados.get(timeout=5)
+        except queue.Empty:
+            ativos = {w for w in ativos if processos[w].is_alive()}
+            continue
+        if tipo == "encerrado":
+            resumos_ingestao.append(dados["ingestao"])
+            ativos.discard(worker_id)
+    for processo in processos.values():
+        processo.join()
+
+    report = [relatorio[cnpj] for cnpj in cnpjs if cnpj in relatorio]
+    sucesso = sum(1 for r in report if r["sucesso"])
+    realocados = sum(1 for r in report if r["sucesso"] and len(r["workers"]) > 1)
+    logging.info(
+        f"CNPJs Vivo: {sucesso} processado(s) com sucesso, {len(report) - sucesso} com falha, "
+        f"{realocados} recuperado(s) em outro worker."
+    )
+    return {"cnpjs": report, "ingestao": somar_resumos_ingestao(*resumos_ingestao)}
+
+
+def collect_cnpjs(driver):
+    customer_selector = CustomerSelectorPage(driver)
+    customer_selector.open_menu()
+    cnpjs = customer_selector.get_cnpjs()
+    customer_selector.close_menu()
+    return cnpjs
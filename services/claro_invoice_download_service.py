@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.support.ui import WebDriverWait
 from utils.download_utils import mover_arquivo
 from pages.claro.claro_pending_invoices_page import FaturasPendentesPage
@@ -6,33 +7,49 @@ from pages.claro.claro_pending_invoices_page import FaturasPendentesPage
 logger = logging.getLogger(__name__)
 
 class DownloadService:
-    def __init__(self, driver, faturas_pendentes_page: FaturasPendentesPage, timeout=30):
+    def __init__(self, driver, faturas_pendentes_page: FaturasPendentesPage, timeout=30, download_dir: str = None):
         self.driver = driver
         self.wait = WebDriverWait(driver, timeout)
         self.faturas_pendentes_page = faturas_pendentes_page
+        self.download_dir = download_dir
+        self.timeout = timeout
 
     def baixar_faturas(self, numero_contrato: str, linux_download_dir: str, _: str = None):
         logger.info(f"Iniciando processo de download para contrato {numero_contrato}...")
 
         try:
-            nome_arquivo = self.faturas_pendentes_page.selecionar_e_baixar_fatura()
-            if not nome_arquivo:
+            nomes_arquivos = self.faturas_pendentes_page.selecionar_e_baixar_faturas()
+            if not nomes_arquivos:
                 logger.warning("Nenhuma fatura pendente disponível para download.")
                 return []
 
-            status = mover_arquivo(nome_arquivo, linux_download_dir, numero_contrato)
-
-            if status == "movido":
-                logger.info("Download concluído.\n")
-            elif status == "existia":
-                logger.info("Arquivo já baixado e presente no diretório de destino.\n")
-            elif status == "nao_encontrado":
-                logger.warning("Falha técnica: arquivo não encontrado.\n")
-            else:
-                logger.error("Falha técnica: erro inesperado ao mover o arquivo.\n")
-
-            return [nome_arquivo]
+            # Todos os downloads já foram disparados: cada arquivo é aguardado e movido assim que termina.
+            with ThreadPoolExecutor(max_workers=min(len(nomes_arquivos), 8)) as executor:
+                resultados = list(executor.map(
+                    lambda nome: self._aguardar_e_mover(nome, numero_contrato, linux_download_dir),
+                    nomes_arquivos
+                ))
+            nomes_arquivos = [nome for nome, _ in resultados]
+
+            for nome_arquivo, status in resultados:
+                if status == "movido":
+                    logger.info(f"Download concluído: {nome_arquivo}.\n")
+                elif status == "existia":
+                    logger.info(f"Arquivo {nome_arquivo} já baixado e presente no diretório de destino.\n")
+                elif status == "nao_encontrado":
+                    logger.warning(f"Falha técnica: arquivo {nome_arquivo} não encontrado.\n")
+                else:
+                    logger.error(f"Falha técnica: erro inesperado ao mover o arquivo {nome_arquivo}.\n")
+
+            return nomes_arquivos
 
         except Exception as e:
             logger.error(f"Falha técnica durante o processo de download. Erro: {type(e).__name__}")
             return []
+
+    def _aguardar_e_mover(self, nome_arquivo: str, numero_contrato: str, destino_dir: str):
+        # Com downloads via CDP, o nome vem do próprio Chrome e o arquivo já está completo ao mover.
+        marca = self.faturas_pendentes_page.marcas_download.get(nome_arquivo)
+        if marca is not None:
+            nome_arquivo = marca.aguardar(timeout=self.timeout) or nome_arquivo
+        return nome_arquivo, mover_arquivo(nome_arquivo, destino_dir, numero_contrato, self.download_dir)
@@ -10,8 +10,14 @@ from selenium.common.exceptions import TimeoutException
 from utils.popup_manager import PopupManager
 from utils.session_manager_vivo import ensure_logged_in
 from pages.vivo.vivo_logging import logger, log_stats
-from pages.vivo.vivo_invoice_page import download_invoices_from_page
+from pages.vivo.vivo_invoice_page import download_invoices_from_page, rows_from_api, GRID_SNAPSHOT_SCRIPT
 from utils.json_failure_logger import JsonFailureLogger
+from utils.network_capture import obter_captura_rede
+
+FIRST_ROW_CUSTOMER = "div.mve-grid-row:first-of-type div[data-test-secondary-info] span"
+
+def _grid_signature(driver):
+    return [(r["customer"], r["due_date"]) for r in driver.execute_script(GRID_SNAPSHOT_SCRIPT) or []]
 
 def download_all_paginated_invoices(driver, popup_manager, download_dir, base_folder, cnpj,
                                     login_page=None, usuario=None, senha=None,
@@ -26,17 +32,19 @@ def download_all_paginated_invoices(driver, popup_manager, download_dir, base_fo
     os.makedirs(target_folder, exist_ok=True)
 
     failure_logger = JsonFailureLogger()
+    # With network capture on, a page change is detected by the grid's API response, not by the DOM.
+    capture = obter_captura_rede(driver, os.getenv("VIVO_API_FATURAS_PADRAO", r"invoice|fatura|bill"))
+    api_responding = True
 
     page = 1
     first = ""
+    api_rows = None
 
     attempts = 0
     while attempts < 2:
         try:
             first = WebDriverWait(driver, 15, 0.3).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "div.mve-grid-row:first-of-type div[data-test-secondary-info] span")
-                )
+                EC.presence_of_element_located((By.CSS_SELECTOR, FIRST_ROW_CUSTOMER))
             ).text.strip()
             break
         except TimeoutException:
@@ -70,7 +78,7 @@ def download_all_paginated_invoices(driver, popup_manager, download_dir, base_fo
 
         download_invoices_from_page(driver, popup_manager, download_dir, target_folder, cnpj,
                                     login_page, usuario, senha, reopen_customer_fn, skip_existing,
-                                    page_number=page)
+                                    page_number=page, rows=api_rows)
 
         try:
             next_btn = WebDriverWait(driver, 8, 0.2).until(
@@ -78,18 +86,31 @@ def download_all_paginated_invoices(driver, popup_manager, download_dir, base_fo
             )
             if not next_btn.is_enabled():
                 break
-            driver.execute_script("arguments[0].click();", next_btn)
-
-            WebDriverWait(driver, 15, 0.3).until(
-                lambda d: d.find_element(
-                    By.CSS_SELECTOR,
-                    "div.mve-grid-row:first-of-type div[data-test-secondary-info] span"
-                ).text.strip() != first
-            )
-            first = driver.find_element(
-                By.CSS_SELECTOR,
-                "div.mve-grid-row:first-of-type div[data-test-secondary-info] span"
-            ).text.strip()
+            if capture is None:
+                driver.execute_script("arguments[0].click();", next_btn)
+                WebDriverWait(driver, 15, 0.3).until(
+                    lambda d: d.find_element(By.CSS_SELECTOR, FIRST_ROW_CUSTOMER).text.strip() != first
+                )
+                first = driver.find_element(By.CSS_SELECTOR, FIRST_ROW_CUSTOMER).text.strip()
+            else:
+                # The API response is the page-change signal and the page's invoice list; the grid is only
+                # polled when no response was captured or its fields are not configured.
+                signature = _grid_signature(driver)
+                marker = capture.marcar()
+                driver.execute_script("arguments[0].click();", next_btn)
+                payload = capture.aguardar_resposta(marker, timeout=15) if api_responding else None
+                api_rows = rows_from_api(payload) if payload is not None else None
+                if payload is None and api_responding:
+                    # URL fora do padrão configurado: as próximas páginas são confirmadas só pela grade.
+                    api_responding = False
+                    logger.warning(
+                        f"Página {page + 1}: nenhuma resposta da API de faturas capturada (VIVO_API_FATURAS_PADRAO); "
+                        "confirmando a troca de página pela grade."
+                    )
+                if api_rows:
+                    logger.debug(f"Página {page + 1}: {len(api_rows)} fatura(s) lidas da resposta da API.")
+                else:
+                    WebDriverWait(driver, 15, 0.1).until(lambda d: _grid_signature(d) != signature)
             page += 1
         except TimeoutException:
             break
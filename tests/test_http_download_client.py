@@ -0,0 +1,121 @@
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import http_download_client
+from utils.http_download_client import ClienteDownloadHttp, encerrar_cliente_http, obter_cliente_http
+
+
+class _PortalFalso(BaseHTTPRequestHandler):
+    # Entrega o PDF só com o cookie de sessão; sem ele responde a página de login, como os portais.
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/ausente"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if "sessao=abc" in (self.headers.get("Cookie") or ""):
+            corpo = b"%PDF-1.4 " + self.path.encode()
+        else:
+            corpo = b"<html>login</html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+class _DriverFalso:
+    session_id = "sessao-teste"
+
+    def get_cookies(self):
+        return [
+            {"name": "sessao", "value": "abc", "domain": "127.0.0.1", "path": "/"},
+            {"name": "outro", "value": "x", "domain": ".outro.com", "path": "/"},
+        ]
+
+    def execute_script(self, script, *args):
+        return "agente-teste"
+
+
+class TestClienteDownloadHttp(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _PortalFalso)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.servidor.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.cliente = ClienteDownloadHttp(conexoes=2, timeout=5)
+        self.cliente.copiar_sessao(_DriverFalso())
+
+    def tearDown(self):
+        self.cliente.encerrar()
+        self.pasta.cleanup()
+
+    def _caminho(self, nome):
+        return os.path.join(self.pasta.name, nome)
+
+    def test_baixa_pdf_com_cookies_da_sessao(self):
+        self.assertTrue(self.cliente.baixar(f"{self.base}/fatura.pdf", self._caminho("fatura.pdf")))
+        with open(self._caminho("fatura.pdf"), "rb") as f:
+            self.assertTrue(f.read().startswith(b"%PDF"))
+
+    def test_envia_apenas_cookies_do_dominio(self):
+        cabecalhos = self.cliente._cabecalhos(f"{self.base}/fatura.pdf")
+        self.assertEqual(cabecalhos["Cookie"], "sessao=abc")
+        self.assertEqual(cabecalhos["User-Agent"], "agente-teste")
+
+    def test_resposta_que_nao_e_pdf_falha_sem_deixar_arquivo(self):
+        self.cliente.cookies = []
+        self.assertFalse(self.cliente.baixar(f"{self.base}/fatura.pdf", self._caminho("login.pdf")))
+        self.assertEqual(os.listdir(self.pasta.name), [])
+
+    def test_status_de_erro_falha(self):
+        self.assertFalse(self.cliente.baixar(f"{self.base}/ausente.pdf", self._caminho("ausente.pdf")))
+        self.assertEqual(os.listdir(self.pasta.name), [])
+
+    def test_baixar_varios_mantem_a_ordem(self):
+        itens = [(f"{self.base}/{n}.pdf", self._caminho(f"{n}.pdf")) for n in ("a", "b")]
+        itens.append((f"{self.base}/ausente.pdf", self._caminho("c.pdf")))
+        self.assertEqual(self.cliente.baixar_varios(itens), [True, True, False])
+
+
+class TestRegistroClientes(unittest.TestCase):
+    def setUp(self):
+        self.ambiente = os.environ.get("DOWNLOAD_HTTP_DIRETO")
+        os.environ["DOWNLOAD_HTTP_DIRETO"] = "true"
+
+    def tearDown(self):
+        if self.ambiente is None:
+            os.environ.pop("DOWNLOAD_HTTP_DIRETO", None)
+        else:
+            os.environ["DOWNLOAD_HTTP_DIRETO"] = self.ambiente
+
+    def test_encerrar_remove_o_cliente_do_driver(self):
+        driver = _DriverFalso()
+        cliente = obter_cliente_http(driver)
+        self.assertIs(obter_cliente_http(driver), cliente)
+        encerrar_cliente_http(driver)
+        self.assertNotIn(driver.session_id, http_download_client._clientes)
+        self.assertTrue(cliente.executor._shutdown)
+
+    def test_desabilitado_nao_cria_cliente(self):
+        os.environ["DOWNLOAD_HTTP_DIRETO"] = "false"
+        self.assertIsNone(obter_cliente_http(_DriverFalso()))
+
+
+if __name__ == "__main__":
+    unittest.main()
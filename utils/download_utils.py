@@ -1,10 +1,11 @@
 # utils/download_utils.py
 import os
-import time
 import shutil
 import logging
 from dotenv import load_dotenv
 
+from utils.download_watcher import aguardar_download
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -23,34 +24,28 @@ def garantir_diretorio(diretorio: str) -> None:
 
 
 def esperar_arquivo_dinamico(caminho_arquivo: str, intervalo_checar: float = 0.5, timeout: int = 30) -> bool:
-    inicio = time.time()
-    while True:
-        try:
-            if os.path.isfile(caminho_arquivo) and not (
-                os.path.exists(caminho_arquivo + ".crdownload") or
-                os.path.exists(caminho_arquivo + ".part")
-            ):
-                return True
-        except Exception as e:
-            logger.warning(f"Erro ao verificar arquivo {caminho_arquivo}: {e}", exc_info=True)
+    diretorio, nome = os.path.split(caminho_arquivo)
+    if aguardar_download(diretorio, nome=nome, timeout=timeout, intervalo=intervalo_checar):
+        return True
+    logger.warning(f"Timeout: arquivo {caminho_arquivo} não apareceu em até {timeout}s.")
+    return False
 
-        if time.time() - inicio > timeout:
-            logger.warning(f"Timeout: arquivo {caminho_arquivo} não apareceu em até {timeout}s.")
-            return False
 
-        time.sleep(intervalo_checar)
-
-
-def mover_arquivo(nome_arquivo_original: str, destino_dir: str, numero_contrato: str) -> str:
-    if CHROME_DOWNLOAD_DIR is None:
+def mover_arquivo(nome_arquivo_original: str, destino_dir: str, numero_contrato: str, origem_dir: str = None) -> str:
+    origem_dir = origem_dir or CHROME_DOWNLOAD_DIR
+    if origem_dir is None:
         logger.error(
             "A variável de ambiente 'CHROME_DOWNLOAD_DIR' não foi encontrada. Verifique o arquivo .env."
         )
         return "erro"
 
-    origem = os.path.join(CHROME_DOWNLOAD_DIR, nome_arquivo_original)
+    origem = os.path.join(origem_dir, nome_arquivo_original)
     destino = os.path.join(destino_dir, nome_arquivo_original)
 
+    # Chrome já baixa na pasta de destino: só aguarda o arquivo terminar.
+    if os.path.abspath(origem) == os.path.abspath(destino):
+        return "movido" if esperar_arquivo_dinamico(origem) else "nao_encontrado"
+
     if os.path.exists(origem) and os.path.exists(destino):
         logger.info(f"Arquivo já existe em ambos os caminhos: {origem} e {destino}. Avançando.")
         return "existia"
@@ -0,0 +1,167 @@
+# utils/download_watcher.py
+import os
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import logging
+import threading
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES_PARCIAIS = (".crdownload", ".part", ".tmp")
+
+# inotify(7): o navegador grava em um arquivo parcial e o renomeia ao terminar (IN_MOVED_TO);
+# gravações diretas terminam com IN_CLOSE_WRITE.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+EVENTO = struct.Struct("iIII")
+
+
+class MetricasDownloads:
+    def __init__(self):
+        self.concluidos = 0
+        self.expirados = 0
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+        self._lock = threading.Lock()
+
+    def registrar_conclusao(self, segundos: float):
+        with self._lock:
+            self.concluidos += 1
+            self.latencia_total += segundos
+            self.latencia_maxima = max(self.latencia_maxima, segundos)
+
+    def registrar_expiracao(self):
+        with self._lock:
+            self.expirados += 1
+
+
+metricas_downloads = MetricasDownloads()
+
+
+def _carregar_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _carregar_libc()
+
+
+def _abrir_inotify(diretorio: str) -> Optional[int]:
+    if _libc is None:
+        return None
+    fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        return None
+    if _libc.inotify_add_watch(fd, os.fsencode(diretorio), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        logger.debug(f"inotify indisponível para {diretorio} (errno {ctypes.get_errno()}); usando verificação periódica.")
+        os.close(fd)
+        return None
+    return fd
+
+
+def _ler_eventos(fd: int) -> list:
+    nomes = []
+    try:
+        dados = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return nomes
+    posicao = 0
+    while posicao + EVENTO.size <= len(dados):
+        _, _, _, tamanho = EVENTO.unpack_from(dados, posicao)
+        nome = dados[posicao + EVENTO.size:posicao + EVENTO.size + tamanho].rstrip(b"\0")
+        if nome:
+            nomes.append(os.fsdecode(nome))
+        posicao += EVENTO.size + tamanho
+    return nomes
+
+
+def _criterio(diretorio: str, nome: Optional[str], extensao: Optional[str], ignorar: Iterable[str]) -> Callable[[str], bool]:
+    ignorar = set(ignorar)
+
+    def concluido(arquivo: str) -> bool:
+        if arquivo in ignorar or arquivo.lower().endswith(EXTENSOES_PARCIAIS):
+            return False
+        if nome is not None and arquivo != nome:
+            return False
+        if extensao is not None and not arquivo.lower().endswith(extensao.lower()):
+            return False
+        caminho = os.path.join(diretorio, arquivo)
+        return os.path.isfile(caminho) and not any(os.path.exists(caminho + p) for p in EXTENSOES_PARCIAIS)
+
+    return concluido
+
+
+def aguardar_download(diretorio: str, nome: Optional[str] = None, extensao: Optional[str] = None,
+                      ignorar: Iterable[str] = (), timeout: float = 30, intervalo: float = 0.5,
+                      inicio: Optional[float] = None) -> Optional[str]:
+    # Retorna o nome do primeiro arquivo concluído em `diretorio` que atenda aos filtros, ou None no timeout.
+    # `inicio` (time.monotonic do clique, se conhecido) é a base da latência registrada.
+    inicio = inicio if inicio is not None else time.monotonic()
+    limite = time.monotonic() + timeout
+    concluido = _criterio(diretorio, nome, extensao, ignorar)
+    fd = _abrir_inotify(diretorio)
+
+    def encontrado(arquivo: str, modo: str) -> str:
+        latencia = time.monotonic() - inicio
+        metricas_downloads.registrar_conclusao(latencia)
+        logger.debug(f"Download '{arquivo}' concluído em {latencia:.2f}s ({modo}).")
+        return arquivo
+
+    try:
+        # A observação começa antes da listagem inicial: um arquivo concluído entre as duas não se perde.
+        candidatos = [nome] if nome is not None else (os.listdir(diretorio) if os.path.isdir(diretorio) else [])
+        for arquivo in candidatos:
+            if concluido(arquivo):
+                return encontrado(arquivo, "existente")
+
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                metricas_downloads.registrar_expiracao()
+                return None
+
+            if fd is not None:
+                prontos, _, _ = select.select([fd], [], [], restante)
+                for arquivo in _ler_eventos(fd) if prontos else []:
+                    if concluido(arquivo):
+                        return encontrado(arquivo, "inotify")
+                continue
+
+            time.sleep(min(intervalo, restante))
+            candidatos = [nome] if nome is not None else (os.listdir(diretorio) if os.path.isdir(diretorio) else [])
+            for arquivo in candidatos:
+                if concluido(arquivo):
+                    return encontrado(arquivo, "verificação periódica")
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+def obter_metricas_downloads() -> dict:
+    with metricas_downloads._lock:
+        return {
+            "concluidos": metricas_downloads.concluidos,
+            "expirados": metricas_downloads.expirados,
+            "latencia_media_s": (metricas_downloads.latencia_total / metricas_downloads.concluidos) if metricas_downloads.concluidos else 0.0,
+            "latencia_maxima_s": metricas_downloads.latencia_maxima,
+        }
+
+
+def registrar_metricas_downloads():
+    metricas = obter_metricas_downloads()
+    if metricas["concluidos"] or metricas["expirados"]:
+        logger.info(
+            f"Downloads: {metricas['concluidos']} concluído(s), {metricas['expirados']} expirado(s), "
+            f"latência média {metricas['latencia_media_s']:.2f}s, máxima {metricas['latencia_maxima_s']:.2f}s."
+        )
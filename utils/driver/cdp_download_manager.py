@@ -0,0 +1,238 @@
+# utils/driver/cdp_download_manager.py
+import os
+import json
+import time
+import logging
+import threading
+import urllib.request
+from typing import Optional
+
+from utils.download_watcher import metricas_downloads
+
+logger = logging.getLogger(__name__)
+
+
+def downloads_cdp_habilitados() -> bool:
+    return os.getenv("CDP_DOWNLOADS", "false").lower() in ("1", "true", "sim")
+
+
+def _detalhes_cdp(driver):
+    # Endpoint do navegador (não da aba): Browser.setDownloadBehavior e os eventos de download são de nível do navegador.
+    if driver.caps.get("se:cdp"):
+        return driver.caps["se:cdp"], driver.caps.get("se:cdpVersion", "").split(".")[0]
+    endereco = driver.caps.get("goog:chromeOptions", {}).get("debuggerAddress")
+    with urllib.request.urlopen(f"http://{endereco}/json/version", timeout=10) as resposta:
+        dados = json.load(resposta)
+    return dados["webSocketDebuggerUrl"], dados["Browser"].split("/")[1].split(".")[0]
+
+
+def _nome_disponivel(diretorio: str, nome: str) -> str:
+    # Como o Chrome: "fatura.pdf" já existente vira "fatura (1).pdf", "fatura (2).pdf"...
+    base, extensao = os.path.splitext(nome)
+    candidato, contador = nome, 1
+    while os.path.exists(os.path.join(diretorio, candidato)):
+        candidato = f"{base} ({contador}){extensao}"
+        contador += 1
+    return candidato
+
+
+class MarcaDownload:
+    def __init__(self, gerenciador: "GerenciadorDownloadsCDP", indice: int):
+        self.gerenciador = gerenciador
+        self.indice = indice
+
+    def aguardar(self, extensao: Optional[str] = None, timeout: float = 30) -> Optional[str]:
+        return self.gerenciador.aguardar(self, extensao, timeout)
+
+
+class GerenciadorDownloadsCDP:
+    def __init__(self, driver, download_dir: str):
+        # Cada download é identificado pelo GUID do Chrome; o arquivo é gravado com o GUID como nome
+        # (allowAndName) e renomeado para o nome sugerido quando o Chrome informa "completed".
+        self.driver = driver
+        self.download_dir = os.path.abspath(download_dir)
+        self._downloads = []
+        self._por_guid = {}
+        self._reservados = set()
+        self._condicao = threading.Condition()
+        self._pronto = threading.Event()
+        self._ativo = False
+        self._encerrando = False
+        self._erro = None
+        self._token = None
+        self._escopo = None
+        self._thread = threading.Thread(target=self._executar, name="cdp-downloads", daemon=True)
+
+    def iniciar(self, timeout: float = 15) -> bool:
+        self._thread.start()
+        self._pronto.wait(timeout)
+        return self._ativo
+
+    def _executar(self):
+        import trio
+        try:
+            trio.run(self._escutar)
+        except Exception as e:
+            self._erro = e
+            logger.warning(f"Monitoramento de downloads via CDP encerrado. Erro: {type(e).__name__}")
+        finally:
+            with self._condicao:
+                self._ativo = False
+                self._condicao.notify_all()
+            self._pronto.set()
+            if not self._encerrando:
+                self._restaurar_downloads()
+
+    def _restaurar_downloads(self, timeout: float = 60):
+        # Sem o monitoramento, o Chrome continuaria gravando arquivos com o GUID como nome, que a
+        # verificação da pasta (por extensão) nunca encontra: volta ao comportamento padrão e renomeia
+        # os downloads que estavam em andamento assim que terminarem.
+        try:
+            self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+                "behavior": "allow", "downloadPath": self.download_dir, "eventsEnabled": False
+            })
+        except Exception as e:
+            logger.warning(f"Não foi possível restaurar o comportamento de download do Chrome. Erro: {type(e).__name__}")
+
+        with self._condicao:
+            pendentes = [d for d in self._downloads if d["estado"] == "inProgress"]
+        limite = time.monotonic() + timeout
+        while pendentes and time.monotonic() < limite:
+            for download in list(pendentes):
+                if os.path.isfile(os.path.join(self.download_dir, download["guid"])):
+                    self._registrar_fim(download["guid"], "completed")
+                    pendentes.remove(download)
+            time.sleep(0.5)
+        for download in pendentes:
+            logger.warning(f"Download '{download['nome']}' não concluído após o fim do monitoramento via CDP.")
+
+    async def _escutar(self):
+        import trio
+        from selenium.webdriver.common.bidi import cdp
+
+        ws_url, versao = _detalhes_cdp(self.driver)
+        devtools = cdp.import_devtools(versao)
+        # Token e escopo permitem que encerrar() interrompa a escuta a partir de outra thread.
+        self._token = trio.lowlevel.current_trio_token()
+        self._escopo = trio.CancelScope()
+        with self._escopo:
+            await self._receber_eventos(cdp, devtools, ws_url)
+
+    async def _receber_eventos(self, cdp, devtools, ws_url):
+        async with cdp.open_cdp(ws_url) as conexao:
+            await conexao.execute(devtools.browser.set_download_behavior(
+                behavior="allowAndName", download_path=self.download_dir, events_enabled=True
+            ))
+            self._ativo = True
+            self._pronto.set()
+            async for evento in conexao.listen(devtools.browser.DownloadWillBegin, devtools.browser.DownloadProgress,
+                                               buffer_size=1000):
+                if isinstance(evento, devtools.browser.DownloadWillBegin):
+                    self._registrar_inicio(evento.guid, evento.suggested_filename)
+                elif evento.state in ("completed", "canceled"):
+                    self._registrar_fim(evento.guid, evento.state)
+
+    def _registrar_inicio(self, guid: str, nome: str):
+        with self._condicao:
+            download = {"guid": guid, "nome": nome, "estado": "inProgress", "inicio": time.monotonic()}
+            self._downloads.append(download)
+            self._por_guid[guid] = download
+            self._condicao.notify_all()
+
+    def _registrar_fim(self, guid: str, estado: str):
+        with self._condicao:
+            download = self._por_guid.get(guid)
+            if download is None:
+                return
+            if estado == "completed":
+                try:
+                    nome = _nome_disponivel(self.download_dir, download["nome"])
+                    os.rename(os.path.join(self.download_dir, guid), os.path.join(self.download_dir, nome))
+                    download["nome"] = nome
+                except OSError as e:
+                    logger.warning(f"Não foi possível renomear o download '{download['nome']}': {e}")
+                    estado = "canceled"
+            download["estado"] = estado
+            download["duracao"] = time.monotonic() - download["inicio"]
+            self._condicao.notify_all()
+
+    def encerrar(self, timeout: float = 5):
+        # Chamado antes de encerrar o driver: interrompe a escuta sem restaurar downloads.
+        import trio
+        self._encerrando = True
+        if self._token is not None and self._escopo is not None:
+            try:
+                trio.from_thread.run_sync(self._escopo.cancel, trio_token=self._token)
+            except trio.RunFinishedError:
+                pass
+        self._thread.join(timeout)
+
+    def marcar(self) -> MarcaDownload:
+        # Chamar antes do clique: o download correspondente é o primeiro iniciado depois da marca.
+        with self._condicao:
+            return MarcaDownload(self, len(self._downloads))
+
+    def aguardar(self, marca: MarcaDownload, extensao: Optional[str] = None, timeout: float = 30) -> Optional[str]:
+        limite = time.monotonic() + timeout
+        with self._condicao:
+            download = None
+            while True:
+                if download is None:
+                    download = next((
+                        d for d in self._downloads[marca.indice:]
+                        if d["guid"] not in self._reservados
+                        and (extensao is None or d["nome"].lower().endswith(extensao.lower()))
+                    ), None)
+                    if download is not None:
+                        self._reservados.add(download["guid"])
+
+                if download is not None and download["estado"] != "inProgress":
+                    if download["estado"] != "completed":
+                        return None
+                    metricas_downloads.registrar_conclusao(download["duracao"])
+                    logger.debug(f"Download '{download['nome']}' concluído em {download['duracao']:.2f}s (CDP).")
+                    return download["nome"]
+
+                restante = limite - time.monotonic()
+                if restante <= 0 or not self._ativo:
+                    metricas_downloads.registrar_expiracao()
+                    return None
+                self._condicao.wait(restante)
+
+
+_gerenciadores = {}
+_gerenciadores_lock = threading.Lock()
+
+
+def ativar_downloads_cdp(driver, download_dir: str) -> Optional[GerenciadorDownloadsCDP]:
+    if not downloads_cdp_habilitados():
+        return None
+    gerenciador = GerenciadorDownloadsCDP(driver, download_dir)
+    try:
+        ativo = gerenciador.iniciar()
+    except Exception as e:
+        ativo = False
+        logger.warning(f"Falha ao iniciar downloads via CDP. Erro: {type(e).__name__}")
+    if not ativo:
+        logger.warning("Downloads via CDP indisponíveis; usando o monitoramento da pasta de downloads.")
+        return None
+
+    with _gerenciadores_lock:
+        _gerenciadores[driver.session_id] = gerenciador
+    logger.info(f"Downloads monitorados via CDP em {gerenciador.download_dir}.")
+    return gerenciador
+
+
+def desativar_downloads_cdp(driver):
+    with _gerenciadores_lock:
+        gerenciador = _gerenciadores.pop(getattr(driver, "session_id", None), None)
+    if gerenciador is not None:
+        gerenciador.encerrar()
+
+
+def marcar_download(driver) -> Optional[MarcaDownload]:
+    with _gerenciadores_lock:
+        gerenciador = _gerenciadores.get(getattr(driver, "session_id", None))
+    if gerenciador is None or not gerenciador._ativo:
+        return None
+    return gerenciador.marcar()
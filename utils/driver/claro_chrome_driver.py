@@ -1,12 +1,14 @@
 #claro_chrome_driver
 import logging
-import os
-import time
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from dotenv import load_dotenv
 
+from utils.driver.cdp_download_manager import ativar_downloads_cdp
+from utils.driver.driver_pool import aguardar_driver_pronto, iniciar_chrome
+from utils.driver.performance_profile import aplicar_perfil_desempenho, configurar_perfil_desempenho
+from utils.network_capture import configurar_captura_rede
+
 logger = logging.getLogger(__name__)
 
 def configurar_driver_chrome(
@@ -33,13 +35,10 @@ def configurar_driver_chrome(
         "plugins.always_open_pdf_externally": True
     }
     options.add_experimental_option("prefs", prefs)
+    configurar_captura_rede(options)
+    configurar_perfil_desempenho(options)
 
-    chromedriver_path = os.getenv("CHROMEDRIVER_PATH")
-    if not chromedriver_path:
-        raise ValueError("Variável de ambiente 'CHROMEDRIVER_PATH' não encontrada.")
-    
-    service = Service(chromedriver_path)
-    driver = webdriver.Chrome(service=service, options=options)
+    driver = iniciar_chrome(options)
     
     driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
         "source": """
@@ -49,7 +48,10 @@ def configurar_driver_chrome(
         """
     })
     
-    # Pequena espera para estabilidade
-    time.sleep(3)
+    if not aguardar_driver_pronto(driver):
+        logger.warning("Navegador não respondeu à verificação de prontidão; seguindo mesmo assim.")
+
+    aplicar_perfil_desempenho(driver)
+    ativar_downloads_cdp(driver, download_dir)
     
     return driver
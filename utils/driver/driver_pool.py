@@ -0,0 +1,193 @@
+# utils/driver/driver_pool.py
+import os
+import time
+import queue
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.service import Service
+
+from utils.driver.cdp_download_manager import desativar_downloads_cdp
+from utils.http_download_client import encerrar_cliente_http
+
+logger = logging.getLogger(__name__)
+
+_chromedriver = None
+_chromedriver_lock = threading.Lock()
+
+
+def _arquivo_cache_chromedriver() -> str:
+    return os.getenv(
+        "CHROMEDRIVER_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "binario-faturas", "chromedriver_path")
+    )
+
+
+def _ler_cache_chromedriver() -> Optional[str]:
+    try:
+        with open(_arquivo_cache_chromedriver(), "r", encoding="utf-8") as f:
+            caminho = f.read().strip()
+    except OSError:
+        return None
+    return caminho if os.path.isfile(caminho) else None
+
+
+def _gravar_cache_chromedriver(caminho: str):
+    try:
+        arquivo = _arquivo_cache_chromedriver()
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        with open(arquivo, "w", encoding="utf-8") as f:
+            f.write(caminho)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o cache do chromedriver: {e}")
+
+
+def resolver_chromedriver() -> str:
+    # Ordem: CHROMEDRIVER_PATH, caminho já resolvido (memória e disco), webdriver-manager (rede) e,
+    # sem rede, o chromedriver do PATH. O webdriver-manager só é consultado quando nada mais serve.
+    global _chromedriver
+    with _chromedriver_lock:
+        if _chromedriver and os.path.isfile(_chromedriver):
+            return _chromedriver
+
+        caminho = os.getenv("CHROMEDRIVER_PATH") or _ler_cache_chromedriver()
+        if not caminho:
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                caminho = ChromeDriverManager().install()
+                _gravar_cache_chromedriver(caminho)
+            except Exception as e:
+                caminho = shutil.which("chromedriver")
+                if not caminho:
+                    raise ValueError(
+                        "Chromedriver não encontrado: defina 'CHROMEDRIVER_PATH' ou conecte-se à rede para baixá-lo."
+                    ) from e
+                logger.warning(f"webdriver-manager indisponível ({type(e).__name__}); usando {caminho}.")
+
+        _chromedriver = caminho
+        logger.debug(f"Chromedriver: {caminho}")
+        return caminho
+
+
+def invalidar_chromedriver():
+    global _chromedriver
+    with _chromedriver_lock:
+        _chromedriver = None
+        try:
+            os.remove(_arquivo_cache_chromedriver())
+        except OSError:
+            pass
+
+
+def iniciar_chrome(options) -> webdriver.Chrome:
+    try:
+        return webdriver.Chrome(service=Service(resolver_chromedriver()), options=options)
+    except SessionNotCreatedException:
+        # Chrome atualizado desde que o chromedriver foi guardado em cache: resolve de novo uma vez.
+        if os.getenv("CHROMEDRIVER_PATH"):
+            raise
+        logger.warning("Chromedriver em cache incompatível com o Chrome instalado; resolvendo novamente.")
+        invalidar_chromedriver()
+        return webdriver.Chrome(service=Service(resolver_chromedriver()), options=options)
+
+
+def driver_saudavel(driver) -> bool:
+    try:
+        return bool(driver.window_handles) and driver.execute_script("return document.readyState") in ("interactive", "complete")
+    except Exception:
+        return False
+
+
+def aguardar_driver_pronto(driver, timeout: float = 10, intervalo: float = 0.2) -> bool:
+    limite = time.monotonic() + timeout
+    while not driver_saudavel(driver):
+        if time.monotonic() >= limite:
+            return False
+        time.sleep(intervalo)
+    return True
+
+
+class PoolDrivers:
+    def __init__(self, fabrica: Callable[[], webdriver.Chrome], tamanho: int = 0):
+        # `tamanho` navegadores ficam pré-iniciados em segundo plano; cada um entregue é reposto.
+        self.fabrica = fabrica
+        self.tamanho = max(0, tamanho)
+        self._prontos = queue.Queue()
+        self._lancando = 0
+        self._encerrado = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, self.tamanho), thread_name_prefix="driver-pool")
+
+    def iniciar(self):
+        for _ in range(self.tamanho):
+            self._lancar()
+
+    def _lancar(self):
+        with self._lock:
+            if self._encerrado or self._lancando + self._prontos.qsize() >= self.tamanho:
+                return
+            self._lancando += 1
+        self._executor.submit(self._criar)
+
+    def _criar(self):
+        inicio = time.monotonic()
+        driver = None
+        try:
+            driver = self.fabrica()
+            logger.debug(f"Navegador pré-iniciado em {time.monotonic() - inicio:.1f}s.")
+        except Exception as e:
+            logger.warning(f"Falha ao pré-iniciar navegador. Erro: {type(e).__name__}")
+        with self._lock:
+            self._lancando -= 1
+            encerrado = self._encerrado
+        if driver is not None and encerrado:
+            self.descartar(driver)
+            return
+        # None sinaliza a quem aguarda em obter() que este lançamento falhou.
+        self._prontos.put(driver)
+
+    def obter(self, timeout: float = 120) -> webdriver.Chrome:
+        limite = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                aguardar = self._lancando > 0
+            try:
+                driver = self._prontos.get(timeout=max(0, limite - time.monotonic())) if aguardar else self._prontos.get_nowait()
+            except queue.Empty:
+                break
+            if driver is None:
+                continue
+            if driver_saudavel(driver):
+                self._lancar()
+                return driver
+            logger.warning("Navegador pré-iniciado não responde; descartando.")
+            self.descartar(driver)
+
+        # Nenhum navegador pronto nem em preparo: inicia um agora.
+        driver = self.fabrica()
+        self._lancar()
+        return driver
+
+    def descartar(self, driver):
+        try:
+            desativar_downloads_cdp(driver)
+            encerrar_cliente_http(driver)
+            driver.quit()
+        except Exception:
+            pass
+
+    def encerrar(self):
+        with self._lock:
+            self._encerrado = True
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                driver = self._prontos.get_nowait()
+            except queue.Empty:
+                break
+            if driver is not None:
+                self.descartar(driver)
@@ -0,0 +1,132 @@
+# utils/driver/performance_profile.py
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Padrões do Network.setBlockedURLs: imagens, fontes, analytics/rastreadores e a pesquisa da Qualtrics.
+PADROES_BLOQUEADOS = (
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googleadservices.com*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*nr-data.net*", "*newrelic.com*",
+    "*qualtrics.com*", "*siteintercept*",
+)
+
+ARGUMENTOS_RENDERIZADOR = (
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+)
+
+# Tempos da navegação do documento atual: fim do DOMContentLoaded e fim do evento load (ou agora, se ele
+# ainda não ocorreu). Com pageLoadStrategy "eager" o driver segue no primeiro, sem aguardar o segundo.
+SCRIPT_TEMPOS_NAVEGACAO = """
+const n = performance.getEntriesByType('navigation')[0];
+if (!n) return null;
+return {
+    origem: performance.timeOrigin,
+    url: location.href,
+    pronto: n.domContentLoadedEventEnd,
+    carregado: n.loadEventEnd || performance.now()
+};
+"""
+
+
+def perfil_desempenho_habilitado() -> bool:
+    return os.getenv("PERFIL_DESEMPENHO", "false").lower() in ("1", "true", "sim")
+
+
+def configurar_perfil_desempenho(options):
+    if not perfil_desempenho_habilitado():
+        return
+    if os.getenv("PERFIL_DESEMPENHO_HEADLESS", "true").lower() in ("1", "true", "sim"):
+        options.add_argument("--headless=new")
+        # Sem janela, --start-maximized não tem efeito; o tamanho fixo mantém o layout desktop dos portais.
+        options.add_argument("--window-size=1920,1080")
+    for argumento in ARGUMENTOS_RENDERIZADOR:
+        options.add_argument(argumento)
+    options.page_load_strategy = "eager"
+
+
+def aplicar_perfil_desempenho(driver):
+    # O bloqueio vale para a aba controlada pelo driver.
+    if not perfil_desempenho_habilitado():
+        return
+    padroes = list(PADROES_BLOQUEADOS)
+    extras = os.getenv("PERFIL_DESEMPENHO_BLOQUEIOS", "")
+    padroes.extend(p.strip() for p in extras.split(",") if p.strip())
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+        logger.info(f"Perfil de desempenho ativo: {len(padroes)} padrões de URL bloqueados.")
+    except Exception as e:
+        logger.warning(f"Não foi possível bloquear URLs via CDP. Erro: {type(e).__name__}")
+
+
+def pagina_pronta(driver) -> bool:
+    # Com o perfil ativo, "interactive" basta: os elementos são aguardados explicitamente por quem usa a página.
+    estado = driver.execute_script("return document.readyState")
+    return estado == "complete" or (estado == "interactive" and perfil_desempenho_habilitado())
+
+
+class MetricasCarregamento:
+    def __init__(self):
+        self.paginas = 0
+        self.espera_load_total = 0.0
+        self.espera_load_maxima = 0.0
+        self._ultima_origem = {}
+        self._lock = threading.Lock()
+
+    def coletar(self, driver):
+        # Chamar antes de sair da página (nova navegação ou encerramento do driver).
+        if not perfil_desempenho_habilitado():
+            return
+        try:
+            tempos = driver.execute_script(SCRIPT_TEMPOS_NAVEGACAO)
+        except Exception:
+            return
+        if not tempos or not tempos.get("pronto"):
+            return
+        with self._lock:
+            if self._ultima_origem.get(driver.session_id) == tempos["origem"]:
+                return
+            self._ultima_origem[driver.session_id] = tempos["origem"]
+            espera_load = max(0.0, (tempos["carregado"] - tempos["pronto"]) / 1000)
+            self.paginas += 1
+            self.espera_load_total += espera_load
+            self.espera_load_maxima = max(self.espera_load_maxima, espera_load)
+        logger.debug(
+            f"Página {tempos['url']}: DOM pronto em {tempos['pronto'] / 1000:.2f}s, "
+            f"evento load {espera_load:.2f}s depois."
+        )
+
+
+metricas_carregamento = MetricasCarregamento()
+
+
+def abrir_pagina(driver, url: str):
+    metricas_carregamento.coletar(driver)
+    driver.get(url)
+
+
+def registrar_metricas_carregamento(driver=None):
+    # Com o driver ainda aberto, a página atual também entra na conta.
+    if driver is not None:
+        metricas_carregamento.coletar(driver)
+    with metricas_carregamento._lock:
+        paginas = metricas_carregamento.paginas
+        total = metricas_carregamento.espera_load_total
+        maxima = metricas_carregamento.espera_load_maxima
+    if paginas:
+        logger.info(
+            f"Carregamento de páginas: {paginas} página(s), evento load em média {total / paginas:.2f}s após o "
+            f"DOM pronto (máximo {maxima:.2f}s, total {total:.2f}s)."
+        )
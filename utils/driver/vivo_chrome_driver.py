@@ -1,9 +1,12 @@
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 import os
 
+from utils.driver.cdp_download_manager import ativar_downloads_cdp
+from utils.driver.driver_pool import iniciar_chrome
+from utils.driver.performance_profile import aplicar_perfil_desempenho, configurar_perfil_desempenho
+from utils.network_capture import configurar_captura_rede
+
 def create_driver(download_dir):
 
     options = Options()
@@ -20,5 +23,10 @@ def create_driver(download_dir):
     }
 
     options.add_experimental_option("prefs", prefs)
+    configurar_captura_rede(options)
+    configurar_perfil_desempenho(options)
 
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver = iniciar_chrome(options)
+    aplicar_perfil_desempenho(driver)
+    ativar_downloads_cdp(driver, download_dir)
+    return driver
@@ -0,0 +1,135 @@
+# utils/http_download_client.py
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import urllib3
+
+logger = logging.getLogger(__name__)
+
+# Primeiros bytes aceitos: PDF ou ZIP. Qualquer outra coisa (ex.: a página de login em HTML) é falha.
+ASSINATURAS_ARQUIVO = (b"%PDF", b"PK\x03\x04")
+
+
+def download_http_habilitado() -> bool:
+    return os.getenv("DOWNLOAD_HTTP_DIRETO", "false").lower() in ("1", "true", "sim")
+
+
+class ClienteDownloadHttp:
+    def __init__(self, conexoes: int = 4, timeout: float = 30):
+        # Conexões keep-alive reaproveitadas entre os downloads do mesmo host.
+        self.conexoes = max(1, conexoes)
+        self.pool = urllib3.PoolManager(
+            num_pools=4,
+            maxsize=self.conexoes,
+            block=True,
+            timeout=urllib3.Timeout(connect=10, read=timeout),
+            retries=urllib3.Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.conexoes, thread_name_prefix="download-http")
+        self.cookies = []
+        self.user_agent = None
+        self._lock = threading.Lock()
+
+    def copiar_sessao(self, driver):
+        # Cookies e user agent da sessão autenticada do Selenium.
+        cookies = driver.get_cookies()
+        user_agent = driver.execute_script("return navigator.userAgent;")
+        with self._lock:
+            self.cookies = cookies
+            self.user_agent = user_agent
+
+    def aceita(self, url: Optional[str]) -> bool:
+        return bool(url) and urlsplit(url).scheme in ("http", "https")
+
+    def _cabecalhos(self, url: str) -> dict:
+        partes = urlsplit(url)
+        host = partes.hostname or ""
+        caminho = partes.path or "/"
+        with self._lock:
+            cookies = [
+                f"{c['name']}={c['value']}" for c in self.cookies
+                if (host == c.get("domain", "").lstrip(".") or host.endswith("." + c.get("domain", "").lstrip(".")))
+                and caminho.startswith(c.get("path") or "/")
+                and (partes.scheme == "https" or not c.get("secure"))
+            ]
+            cabecalhos = {"User-Agent": self.user_agent} if self.user_agent else {}
+        if cookies:
+            cabecalhos["Cookie"] = "; ".join(cookies)
+        return cabecalhos
+
+    def baixar(self, url: str, caminho: str) -> bool:
+        # Grava em "<caminho>.part" e renomeia só se a resposta for de fato um PDF/ZIP.
+        parcial = caminho + ".part"
+        resposta = None
+        try:
+            resposta = self.pool.request("GET", url, headers=self._cabecalhos(url), preload_content=False)
+            if resposta.status != 200:
+                logger.warning(f"Download HTTP de '{os.path.basename(caminho)}' retornou status {resposta.status}.")
+                return False
+
+            inicio = True
+            with open(parcial, "wb") as arquivo:
+                for bloco in resposta.stream(64 * 1024):
+                    if inicio:
+                        if not bloco.startswith(ASSINATURAS_ARQUIVO):
+                            logger.warning(f"Download HTTP de '{os.path.basename(caminho)}' não retornou PDF/ZIP.")
+                            return False
+                        inicio = False
+                    arquivo.write(bloco)
+            if inicio:
+                return False
+            os.replace(parcial, caminho)
+            return True
+        except (urllib3.exceptions.HTTPError, OSError) as e:
+            logger.warning(f"Falha no download HTTP de '{os.path.basename(caminho)}'. Erro: {type(e).__name__}")
+            return False
+        finally:
+            if resposta is not None:
+                resposta.release_conn()
+            if os.path.exists(parcial):
+                os.remove(parcial)
+
+    def enviar(self, url: str, caminho: str) -> Future:
+        return self.executor.submit(self.baixar, url, caminho)
+
+    def baixar_varios(self, itens: List[Tuple[str, str]]) -> List[bool]:
+        return [futuro.result() for futuro in [self.enviar(url, caminho) for url, caminho in itens]]
+
+    def encerrar(self):
+        self.executor.shutdown(wait=True)
+        self.pool.clear()
+
+
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+
+def obter_cliente_http(driver) -> Optional[ClienteDownloadHttp]:
+    # Um cliente por navegador; os cookies são recopiados a cada uso para acompanhar renovações da sessão.
+    if not download_http_habilitado():
+        return None
+    with _clientes_lock:
+        cliente = _clientes.get(driver.session_id)
+        if cliente is None:
+            cliente = ClienteDownloadHttp(
+                conexoes=int(os.getenv("DOWNLOAD_HTTP_CONEXOES", "4")),
+                timeout=float(os.getenv("DOWNLOAD_HTTP_TIMEOUT", "30")),
+            )
+            _clientes[driver.session_id] = cliente
+    try:
+        cliente.copiar_sessao(driver)
+    except Exception as e:
+        logger.warning(f"Não foi possível copiar a sessão do navegador para downloads HTTP. Erro: {type(e).__name__}")
+        return None
+    return cliente
+
+
+def encerrar_cliente_http(driver):
+    with _clientes_lock:
+        cliente = _clientes.pop(getattr(driver, "session_id", None), None)
+    if cliente is not None:
+        cliente.encerrar()
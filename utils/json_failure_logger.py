@@ -1,9 +1,27 @@
 import os
 import json
+import fcntl
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def anexar_registro_json(caminho: str, dados: dict):
+    # Leitura + escrita sob lock exclusivo: vários workers (processos) podem registrar falhas no mesmo arquivo.
+    with open(f"{caminho}.lock", "w") as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        try:
+            registros = []
+            if os.path.exists(caminho):
+                with open(caminho, "r", encoding="utf-8") as f:
+                    registros = json.load(f) or []
+            registros.append(dados)
+            with open(caminho, "w", encoding="utf-8") as f:
+                json.dump(registros, f, ensure_ascii=False, indent=4)
+        finally:
+            fcntl.flock(trava, fcntl.LOCK_UN)
+
+
 class JsonFailureLogger:
     def __init__(self):
         # Obtém o caminho do diretório de downloads do env
@@ -32,26 +50,14 @@ class JsonFailureLogger:
 
     def registrar_falha_claro(self, dados_falha: dict):
         try:
-            falhas_existentes = []
-            if os.path.exists(self.claro_json_path):
-                with open(self.claro_json_path, "r", encoding="utf-8") as f:
-                    falhas_existentes = json.load(f) or []
-            falhas_existentes.append(dados_falha)
-            with open(self.claro_json_path, "w", encoding="utf-8") as f:
-                json.dump(falhas_existentes, f, ensure_ascii=False, indent=4)
+            anexar_registro_json(self.claro_json_path, dados_falha)
             logger.info(f"Falha registrada no JSON (Claro): {dados_falha}")
         except Exception as e:
             logger.error(f"Erro ao registrar falha em JSON (Claro): {e}")
 
     def registrar_falha_vivo(self, dados_falha: dict):
         try:
-            falhas_existentes = []
-            if os.path.exists(self.vivo_json_path):
-                with open(self.vivo_json_path, "r", encoding="utf-8") as f:
-                    falhas_existentes = json.load(f) or []
-            falhas_existentes.append(dados_falha)
-            with open(self.vivo_json_path, "w", encoding="utf-8") as f:
-                json.dump(falhas_existentes, f, ensure_ascii=False, indent=4)
+            anexar_registro_json(self.vivo_json_path, dados_falha)
             logger.info(f"Falha registrada no JSON (Vivo): {dados_falha}")
         except Exception as e:
             logger.error(f"Erro ao registrar falha em JSON (Vivo): {e}")
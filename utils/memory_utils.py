@@ -0,0 +1,21 @@
+# utils/memory_utils.py
+import os
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def rss_atual_mb() -> float:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            paginas_residentes = int(f.read().split()[1])
+        return paginas_residentes * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    if resource is not None:
+        # Sem /proc, o melhor disponível é o pico do processo (em KB no Linux).
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return 0.0
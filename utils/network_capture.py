@@ -0,0 +1,121 @@
+# utils/network_capture.py
+import os
+import re
+import json
+import time
+import base64
+import logging
+import threading
+from datetime import datetime
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def captura_rede_habilitada() -> bool:
+    return os.getenv("CAPTURA_REDE", "false").lower() in ("1", "true", "sim")
+
+
+def configurar_captura_rede(options):
+    # O log de desempenho do chromedriver entrega os eventos Network.* da aba (responseReceived, loadingFinished).
+    if captura_rede_habilitada():
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def extrair_registros(dados: Any) -> List[dict]:
+    # Maior lista de objetos do payload: a lista de faturas/contratos, qualquer que seja o envelope da API.
+    melhor = []
+    pendentes = [dados]
+    while pendentes:
+        atual = pendentes.pop()
+        if isinstance(atual, dict):
+            pendentes.extend(atual.values())
+        elif isinstance(atual, list):
+            objetos = [item for item in atual if isinstance(item, dict)]
+            if len(objetos) > len(melhor):
+                melhor = objetos
+            pendentes.extend(objetos)
+    return melhor
+
+
+class CapturaRede:
+    def __init__(self, driver, padrao_url: str, pasta_registro: Optional[str] = None):
+        self.driver = driver
+        self.padrao = re.compile(padrao_url, re.IGNORECASE)
+        self.pasta_registro = pasta_registro
+        self.respostas = []
+        self._pendentes = {}
+
+    def coletar(self):
+        for entrada in self.driver.get_log("performance"):
+            try:
+                mensagem = json.loads(entrada["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            metodo = mensagem.get("method")
+            params = mensagem.get("params", {})
+
+            if metodo == "Network.responseReceived":
+                resposta = params.get("response", {})
+                if "json" in resposta.get("mimeType", "") and self.padrao.search(resposta.get("url", "")):
+                    self._pendentes[params["requestId"]] = resposta["url"]
+            elif metodo == "Network.loadingFinished" and params.get("requestId") in self._pendentes:
+                url = self._pendentes.pop(params["requestId"])
+                try:
+                    corpo = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+                    texto = base64.b64decode(corpo["body"]) if corpo.get("base64Encoded") else corpo["body"]
+                    dados = json.loads(texto)
+                except Exception as e:
+                    logger.debug(f"Corpo da resposta {url} indisponível: {type(e).__name__}")
+                    continue
+                self.respostas.append({"url": url, "dados": dados})
+                self._registrar(url, dados)
+
+    def _registrar(self, url: str, dados: Any):
+        if not self.pasta_registro:
+            return
+        try:
+            os.makedirs(self.pasta_registro, exist_ok=True)
+            nome = f"{datetime.now():%Y%m%d_%H%M%S}_{len(self.respostas):04d}.json"
+            with open(os.path.join(self.pasta_registro, nome), "w", encoding="utf-8") as f:
+                json.dump({"url": url, "dados": dados}, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            logger.warning(f"Erro ao registrar resposta capturada: {e}")
+
+    def marcar(self) -> int:
+        # Chamar antes da ação (ex.: clique em "próxima"): aguardar_resposta retorna a primeira resposta posterior.
+        self.coletar()
+        return len(self.respostas)
+
+    def aguardar_resposta(self, marca: int, timeout: float = 15, intervalo: float = 0.2) -> Optional[Any]:
+        limite = time.monotonic() + timeout
+        while True:
+            self.coletar()
+            if len(self.respostas) > marca:
+                return self.respostas[marca]["dados"]
+            if time.monotonic() >= limite:
+                return None
+            time.sleep(intervalo)
+
+    def ultima_resposta(self) -> Optional[Any]:
+        self.coletar()
+        return self.respostas[-1]["dados"] if self.respostas else None
+
+
+_capturas = {}
+_capturas_lock = threading.Lock()
+
+
+def obter_captura_rede(driver, padrao_url: str) -> Optional[CapturaRede]:
+    # Uma captura por navegador: o log de desempenho é consumido por quem o lê.
+    if not captura_rede_habilitada():
+        return None
+    with _capturas_lock:
+        captura = _capturas.get(driver.session_id)
+        if captura is None:
+            pasta = None
+            if os.getenv("CAPTURA_REDE_SALVAR", "false").lower() in ("1", "true", "sim") and os.getenv("LINUX_DOWNLOAD_DIR"):
+                pasta = os.path.join(os.getenv("LINUX_DOWNLOAD_DIR"), "captura_rede", driver.session_id)
+            captura = CapturaRede(driver, padrao_url, pasta)
+            _capturas[driver.session_id] = captura
+        return captura
@@ -1,7 +1,11 @@
 import time
+import logging
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from pages.vivo.vivo_login_page import LoginPageVivo
+from utils.popup_manager import PopupManager
+from utils.http_download_client import obter_cliente_http
 
 _primeiro_login = True
 
@@ -35,3 +39,27 @@ def ensure_logged_in(driver, login_page, usuario, senha):
     except Exception as e:
         print(f"Erro ao checar/refazer login: {e}")
     return False
+
+def login_vivo(driver, login_url, usuario, senha, max_login_attempts=3):
+    popup_manager = PopupManager(driver, timeout=2)
+    login_page = LoginPageVivo(driver, login_url)
+    login_page.open_login_page()
+    login_page.perform_login(usuario, senha)
+    popup_manager.handle_all()
+
+    attempt = 0
+    while attempt < max_login_attempts:
+        try:
+            ensure_logged_in(driver, login_page, usuario, senha)
+            # Cookies da sessão autenticada para o download HTTP direto (quando habilitado).
+            obter_cliente_http(driver)
+            return login_page, popup_manager
+        except Exception as e:
+            attempt += 1
+            logging.warning(f"Erro ao checar/refazer login (tentativa {attempt}): {e}")
+            time.sleep(2)
+            login_page.perform_login(usuario, senha)
+            popup_manager.handle_all()
+
+    logging.error("Não foi possível garantir login após várias tentativas.")
+    return None
@@ -1,20 +1,15 @@
 # utils/vivo_file_utils.py
 import os
-import time
 import shutil
 import zipfile
 
-def wait_for_download_file(download_dir, before_files, extension=".pdf", timeout=20):
-    
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        current_files = set(os.listdir(download_dir))
-        new_files = current_files - before_files
-        for f in new_files:
-            if f.lower().endswith(extension.lower()):
-                return f
-        time.sleep(0.5)
-    return None
+from utils.download_watcher import aguardar_download
+
+def wait_for_download_file(download_dir, before_files, extension=".pdf", timeout=20, marker=None):
+    # marker: taken with marcar_download(driver) before the click when CDP download tracking is on.
+    if marker is not None:
+        return marker.aguardar(extension, timeout)
+    return aguardar_download(download_dir, extensao=extension, ignorar=before_files, timeout=timeout)
 
 def move_file(src_path, target_dir, new_name=None, overwrite=False):
 